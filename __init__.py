@@ -19,6 +19,27 @@ bl_info = {
 
 if "bpy" in locals():
     import importlib
+    # core modules before the ones importing them, addon modules after core
+    importlib.reload(core.velocity)
+    importlib.reload(core.trajectory)
+    importlib.reload(core.separation)
+    importlib.reload(core.proximity)
+    importlib.reload(core.stats)
+    importlib.reload(core.geofence)
+    importlib.reload(core.pathfile)
+    importlib.reload(core.ledtrack)
+    importlib.reload(core.stream)
+    importlib.reload(core.pointcache)
+    importlib.reload(core.bezier)
+    importlib.reload(core)
+    importlib.reload(report)
+    importlib.reload(cache)
+    importlib.reload(bake)
+    importlib.reload(swarm)
+    importlib.reload(led)
+    importlib.reload(verify)
+    importlib.reload(export)
+    importlib.reload(batch)
     importlib.reload(ui)
     importlib.reload(operators)
 else:
@@ -36,6 +57,15 @@ else:
             PropertyGroup,
             )
     from . import (
+            core,
+            report,
+            cache,
+            bake,
+            swarm,
+            led,
+            verify,
+            export,
+            batch,
             ui,
             operators,
             )
@@ -107,6 +137,20 @@ class DroneShowSettings(PropertyGroup):
             min=0.0, max=10.0,
             )
 
+    use_downwash = BoolProperty(
+            name="Downwash Separation",
+            description="Use separate vertical minimum distance for drones above each other",
+            default=False,
+            )
+
+    distance_min_v = FloatProperty(
+            name="Min Vertical Distance",
+            description="Minimum allowed vertical distance, Min Distance is used horizontally",
+            subtype='DISTANCE',
+            default=5.0,  # 5m
+            min=0.01, max=30.0,
+            )
+
     velocity_max = FloatProperty(
             name="Max Velocity",
             description="Maximum allowed drone velocity",
@@ -115,6 +159,105 @@ class DroneShowSettings(PropertyGroup):
             min=0.0, max=10.0,
             )
 
+    use_analytic_velocity = BoolProperty(
+            name="Keyframe Velocity",
+            description="Peak speed from the location keyframe curves instead of sampled frames",
+            default=False,
+            )
+
+    use_adaptive = BoolProperty(
+            name="Adaptive Proximity",
+            description="Skip frames where no drones can get closer than the minimum distance",
+            default=False,
+            )
+
+    adaptive_bound = EnumProperty(
+            name="Speed Bound",
+            description="Drone speed used to work out how many frames can be skipped",
+            items=(('LIMIT', "Max Velocity", "Max Velocity limit, only checked frames are evaluated"),
+                   ('MEASURED', "Measured", "Peak speed of each drone, needs a full bake"),
+                   ),
+            default='LIMIT',
+            )
+
+    geofence_radius = FloatProperty(
+            name="Geofence Radius",
+            description="Maximum allowed horizontal distance from origin",
+            subtype='DISTANCE',
+            default=100.0,  # 100m
+            min=0.0, max=300.0,
+            )
+
+    geofence_height = FloatProperty(
+            name="Geofence Height",
+            description="Maximum allowed altitude",
+            subtype='DISTANCE',
+            default=100.0,  # 100m
+            min=0.0, max=300.0,
+            )
+
+    use_streaming = BoolProperty(
+            name="Streaming Export",
+            description="Bake, check and write in windows, memory does not grow with show length",
+            default=False,
+            )
+
+    stream_window = IntProperty(
+            name="Window",
+            description="Waypoints baked at once by streaming export",
+            default=256, min=1, max=50000)
+
+    export_led = BoolProperty(
+            name="Export LED Track",
+            description="Export LED colors as separate event stream",
+            default=False,
+            )
+
+    led_fps = IntProperty(
+            name="LED Framerate",
+            description="Rate at which LED colors are sampled",
+            default=25, min=1, max=120)
+
+    led_tolerance = FloatProperty(
+            name="LED Tolerance",
+            description="Color change smaller than this is not stored",
+            default=0.01,
+            min=0.0, max=1.0,
+            )
+
+    use_cache = BoolProperty(
+            name="Use Cache",
+            description="Reuse bake and check results while the animation is unchanged",
+            default=True,
+            )
+
+    cache_size = IntProperty(
+            name="Cache Size",
+            description="Maximum size of the result cache in MB",
+            default=256, min=1, max=10000)
+
+    batch_path = StringProperty(
+            name="Batch Shows",
+            description="Directory with .blend shows or text file listing them",
+            default="//", maxlen=1024, subtype="FILE_PATH",
+            )
+
+    batch_jobs = IntProperty(
+            name="Batch Jobs",
+            description="Number of Blender instances running at once",
+            default=4, min=1, max=64)
+
+    batch_timeout = IntProperty(
+            name="Batch Timeout",
+            description="Seconds before a background Blender instance is stopped",
+            default=600, min=1, max=86400)
+
+    use_point_cloud = BoolProperty(
+            name="Use Point Cloud",
+            description="Checks and export read drone positions from the point cloud while it matches the drone animation",
+            default=False,
+            )
+
     drones_added = BoolProperty(
             name="Drones Added",
             description="Are drones in the scene",
@@ -178,28 +321,42 @@ classes = (
     operators.DroneCheckVelocity,
     operators.DroneAddDrones,
     operators.DroneRemoveDrones,
+    operators.DroneBuildPointCloud,
+    operators.DroneRemovePointCloud,
 
     operators.DroneShowCheckAll,
+    operators.DroneShowBatchCheck,
 
     operators.DroneShowSelectReport,
 
     operators.DroneShowExport,
+    operators.DroneShowVerifyExport,
+    operators.DroneShowExportStatistics,
 
     DroneShowSettings,
     printpreferences,
     )
 
 
+draw_handle = None
+
+
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
 
     bpy.types.Scene.drone_show = PointerProperty(type=DroneShowSettings)
 
+    global draw_handle
+    draw_handle = bpy.types.SpaceView3D.draw_handler_add(
+            swarm.draw_colors, (), 'WINDOW', 'POST_VIEW')
+
     update_panel(None, bpy.context)
 
 
 def unregister():
+    bpy.types.SpaceView3D.draw_handler_remove(draw_handle, 'WINDOW')
+
     for cls in classes:
         bpy.utils.unregister_class(cls)
 
@@ -0,0 +1,186 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Bake Drone Animation
+# evaluates the scene on whole frames and resamples to the autopilot time grid
+
+import bpy
+import numpy as np
+
+from .core import (
+        trajectory,
+        bezier,
+        )
+
+# F-Curve interpolation the keyframe velocity check can evaluate
+INTERPOLATION = {
+        'CONSTANT': bezier.CONSTANT,
+        'LINEAR': bezier.LINEAR,
+        'BEZIER': bezier.BEZIER,
+        }
+
+
+def waypoint_times(scene, drone_show):
+    """Return autopilot framerate, frame step and (fractional) waypoint frames"""
+    blender_frame_rate = scene.render.fps
+    drone_fps = trajectory.autopilot_fps(blender_frame_rate, drone_show.show_length, drone_show.max_waypoints)
+    step, frames = trajectory.waypoint_times(blender_frame_rate, scene.frame_start, scene.frame_end, drone_fps)
+    return drone_fps, step, frames
+
+
+def evaluate(scene, drones, frames):
+    """Return (frames, drones, 3) positions and colors on whole frames"""
+    positions = np.empty((len(frames), len(drones), 3), dtype=np.float64)
+    colors = np.empty((len(frames), len(drones), 3), dtype=np.float32)
+    for w, f in enumerate(frames):
+        scene.frame_set(int(f))
+        for i, ob in enumerate(drones):
+            positions[w, i] = ob.matrix_world.to_translation()
+            colors[w, i] = ob.active_material.diffuse_color
+    return positions, np.clip(colors, 0.0, 1.0)
+
+
+def evaluator(scene, drone_show, info=None):
+    """Return function evaluating positions and colors on whole frames, from
+    the point cloud when it is used and still matches the drone animation,
+    otherwise from the drone objects"""
+    from . import (
+            swarm,
+            cache,
+            )
+
+    ob = swarm.swarm_object()
+    if drone_show.use_point_cloud and ob is not None:
+        key = cache.bake_key(scene, drone_show)
+        if key is not None and key == ob.get("bake_key"):
+            return lambda scene, frames: swarm.evaluate(scene, ob, frames)
+        print("Point cloud out of date, reading drone objects")
+        if info is not None:
+            info.append("Point cloud out of date, reading drone objects")
+
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    drones = [bpy.data.objects['drone_' + str(i)] for i in range(0, number_of_uavs)]
+    return lambda scene, frames: evaluate(scene, drones, frames)
+
+
+def bake_show(scene, drone_show, frames, info=None, evaluate_frames=None):
+    """Evaluate whole frames, returns (frames, drones, 3) positions in meters and colors in 0..1"""
+    if evaluate_frames is None:
+        evaluate_frames = evaluator(scene, drone_show, info)
+    frame_current = scene.frame_current
+    baked = evaluate_frames(scene, frames)
+    scene.frame_set(frame_current)
+    return baked
+
+
+def waypoint_positions(scene, drone_show, frames, info=None):
+    """Return function evaluating drone positions on one waypoint only,
+    the current frame is not restored"""
+    evaluate_frames = evaluator(scene, drone_show, info)
+
+    def position_at(w):
+        baked = trajectory.bake_frames(frames[w:w + 1])
+        positions, colors = evaluate_frames(scene, baked)
+        return trajectory.resample(baked, positions, colors, frames[w:w + 1])[0][0]
+    return position_at
+
+
+def get_bake(scene, drone_show, info):
+    """Trajectory on the waypoint frames, the whole frame bake is loaded
+    from the cache when the animation is unchanged"""
+    from . import cache
+
+    drone_fps, step, frames = waypoint_times(scene, drone_show)
+    baked = trajectory.bake_frames(frames)
+
+    data = None
+    key = None
+    if drone_show.use_cache:
+        key = cache.bake_key(scene, drone_show)
+        if key is None:
+            info.append("Drones not animated by own keyframes only, cache not used")
+        else:
+            data = cache.load_bake(key)
+            if data is not None:
+                info.append("Using cached bake")
+
+    if data is None:
+        data = bake_show(scene, drone_show, baked, info)
+        if key is not None:
+            cache.store_bake(key, data[0], data[1], drone_show.cache_size)
+
+    positions, colors = trajectory.resample(baked, data[0], data[1], frames)
+    return trajectory.Trajectory(positions, colors, frames, drone_fps)
+
+
+def iter_bake(scene, drone_show, window, info=None):
+    """Yield Trajectory for consecutive windows of waypoints, memory stays
+    proportional to drones x window instead of show length"""
+    drone_fps, step, frames = waypoint_times(scene, drone_show)
+    evaluate_frames = evaluator(scene, drone_show, info)
+    for w0 in range(0, len(frames), window):
+        frames_window = frames[w0:w0 + window]
+        baked = trajectory.bake_frames(frames_window)
+        positions, colors = bake_show(scene, drone_show, baked, evaluate_frames=evaluate_frames)
+        positions, colors = trajectory.resample(baked, positions, colors, frames_window)
+        yield trajectory.Trajectory(positions, colors, frames_window, drone_fps)
+
+
+def _keyframes(fcu):
+    # (keys, 2) co and handles and interpolation codes of one F-Curve
+    points = fcu.keyframe_points
+    data = []
+    for attr in ('co', 'handle_left', 'handle_right'):
+        values = np.empty(len(points) * 2, dtype=np.float32)
+        points.foreach_get(attr, values)
+        data.append(values.reshape(-1, 2).astype(np.float64))
+    interpolation = [INTERPOLATION.get(k.interpolation) for k in points]
+    # interpolation of the last key is never used
+    if None in interpolation[:-1]:
+        return None
+    interpolation = np.array([bezier.CONSTANT if m is None else m for m in interpolation], dtype=int)
+    return data + [interpolation]
+
+
+def keyframe_channels(drone_show):
+    """Return x, y, z bezier.Channel of the drone location F-Curves and
+    (drones, 3) locations of drones without keyframes, None when a drone is
+    moved by parents, constraints, drivers, NLA or F-Curve modifiers"""
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    static = np.empty((number_of_uavs, 3))
+    keys = [[] for axis in range(3)]
+
+    for i in range(0, number_of_uavs):
+        ob = bpy.data.objects['drone_' + str(i)]
+        if ob.parent is not None or len(ob.constraints):
+            return None
+        static[i] = ob.location
+        anim = ob.animation_data
+        if anim is None:
+            continue
+        if len(anim.drivers) or len(anim.nla_tracks):
+            return None
+        if anim.action is None:
+            continue
+        for fcu in anim.action.fcurves:
+            if fcu.mute or fcu.data_path not in ('location', 'delta_location'):
+                continue
+            if fcu.data_path == 'delta_location' or fcu.extrapolation != 'CONSTANT' or len(fcu.modifiers):
+                return None
+            data = _keyframes(fcu)
+            if data is None:
+                return None
+            keys[fcu.array_index].append([np.full(len(data[0]), i)] + data)
+
+    channels = []
+    for axis in keys:
+        if axis:
+            channels.append(bezier.Channel(*[np.concatenate(a) for a in zip(*axis)]))
+        else:
+            empty = np.empty((0, 2))
+            channels.append(bezier.Channel(np.empty(0, dtype=int), empty, empty, empty, np.empty(0, dtype=int)))
+    return channels, static
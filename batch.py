@@ -0,0 +1,175 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Batch Validation
+# runs all checks on many show files in background Blender instances
+
+import bpy
+import os
+import json
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+CACHE_NAME = "drone_batch_cache.json"
+REPORT_NAME = "drone_batch_report.txt"
+RESULT_TAG = "DRONE_BATCH_RESULT:"
+# output lines of a failed background instance kept in the report
+ERROR_LINES = 10
+
+# runs inside the background instance, prints results as one json line
+CHECK_SCRIPT = '''
+import addon_utils, importlib, json
+addon_utils.enable(%(package)r, default_set=False)
+operators = importlib.import_module(%(package)r + ".operators")
+result = {}
+for name, cls in (
+        ("statistics", operators.DroneCheckStatistics),
+        ("distance", operators.DroneCheckDistance),
+        ("velocity", operators.DroneCheckVelocity),
+        ):
+    info = []
+    cls.main_check(None, info)
+    result[name] = info
+print(%(tag)r + json.dumps(result))
+'''
+
+
+def find_shows(path):
+    """Return .blend files in directory, or listed one per line in a text file"""
+    path = bpy.path.abspath(path)
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(".blend")]
+    base = os.path.dirname(path)
+    with open(path) as f:
+        return [os.path.join(base, line.strip()) for line in f
+                if line.strip() and not line.startswith("#")]
+
+
+def file_hash(filepath):
+    sha = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def load_cache(cachepath):
+    try:
+        with open(cachepath) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def check_show(filepath, timeout):
+    """Run the checks on one show in a background Blender instance,
+    killed after timeout seconds"""
+    script = CHECK_SCRIPT % {"package": __package__, "tag": RESULT_TAG}
+    try:
+        proc = subprocess.run(
+                [bpy.app.binary_path, "--background", filepath,
+                 "--python-expr", script],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                universal_newlines=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": "no result after " + str(timeout) + " s"}
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_TAG):
+            return json.loads(line[len(RESULT_TAG):])
+    # script errors still exit with code 0, the output tells what happened
+    return {"error": "no result, Blender exited with code " + str(proc.returncode),
+            "output": proc.stdout.splitlines()[-ERROR_LINES:]}
+
+
+def summarize(name, result):
+    """Return summary line and warning lines for one show"""
+    if "error" in result:
+        return name + ": failed, " + result["error"], []
+    distance = [text for text in result["distance"] if text.startswith("Danger!")]
+    velocity = [text for text in result["velocity"] if text.startswith("Danger!")]
+    if distance or velocity:
+        text = "%s: %d proximity, %d velocity warnings" % (name, len(distance), len(velocity))
+        return text, distance + velocity
+    return name + ": OK", []
+
+
+def batch_check(context, info, report_cb):
+    scene = bpy.context.scene
+    drone_show = scene.drone_show
+
+    try:
+        shows = find_shows(drone_show.batch_path)
+    except OSError as e:
+        info.append("Can't read show list: " + str(e))
+        if report_cb is not None:
+            report_cb({'ERROR'}, "Can't read show list")
+        return False
+
+    if not shows:
+        info.append("No show files found")
+        return False
+
+    base = os.path.dirname(shows[0])
+    cachepath = os.path.join(base, CACHE_NAME)
+    cache = load_cache(cachepath)
+
+    print("\nValidating " + str(len(shows)) + " shows")
+    info.append("Validating " + str(len(shows)) + " shows")
+
+    results = {}
+    hashes = {}
+    pending = []
+    for filepath in shows:
+        try:
+            hashes[filepath] = file_hash(filepath)
+        except OSError as e:
+            results[filepath] = {"error": str(e)}
+            continue
+        if hashes[filepath] in cache:
+            results[filepath] = cache[hashes[filepath]]
+        else:
+            pending.append(filepath)
+
+    print("Cached: " + str(len(shows) - len(pending)) + ", checking: " + str(len(pending)))
+    info.append("Cached: " + str(len(shows) - len(pending)) + ", checking: " + str(len(pending)))
+
+    # every worker thread waits on its own background Blender process
+    with ThreadPoolExecutor(max_workers=drone_show.batch_jobs) as pool:
+        timeouts = [drone_show.batch_timeout] * len(pending)
+        for filepath, result in zip(pending, pool.map(check_show, pending, timeouts)):
+            print("Checked " + os.path.basename(filepath))
+            results[filepath] = result
+            # failed runs are not cached
+            if "error" not in result:
+                cache[hashes[filepath]] = result
+
+    with open(cachepath, 'w') as f:
+        json.dump(cache, f)
+
+    lines = []
+    failed = 0
+    for filepath in shows:
+        result = results[filepath]
+        text, warnings = summarize(os.path.basename(filepath), result)
+        if warnings or "error" in result:
+            failed += 1
+        lines.append(text)
+        lines.extend("    " + t for t in result.get("statistics", ()))
+        lines.extend("    " + t for t in result.get("output", ()))
+        lines.extend("    " + t for t in warnings)
+        info.append(text)
+
+    lines.append("%d of %d shows have warnings or failed" % (failed, len(shows)))
+    info.append("%d of %d shows have warnings or failed" % (failed, len(shows)))
+    with open(os.path.join(base, REPORT_NAME), 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+    if report_cb is not None:
+        report_cb({'INFO'}, "Batch report: %r" % os.path.join(base, REPORT_NAME))
+    return True
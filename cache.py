@@ -0,0 +1,202 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Result Cache
+# bake data and check results stored next to the .blend, keyed by a hash
+# of the drone animation, timing and limit settings
+
+import bpy
+import os
+import json
+import hashlib
+import numpy as np
+
+
+def cache_dir():
+    if bpy.data.is_saved:
+        return os.path.splitext(bpy.data.filepath)[0] + ".dronecache"
+    return os.path.join(bpy.app.tempdir, "dronecache")
+
+
+# transform values that move a drone, hashed when they are not animated
+TRANSFORM = (
+        'location',
+        'rotation_euler',
+        'rotation_quaternion',
+        'rotation_axis_angle',
+        'scale',
+        'delta_location',
+        'delta_rotation_euler',
+        'delta_rotation_quaternion',
+        'delta_scale',
+        )
+
+
+def _own_keyframes(id_data):
+    # animation comes only from the action, no drivers, NLA or F-Curve modifiers
+    anim = id_data.animation_data
+    if anim is None:
+        return True
+    if len(anim.drivers) or len(anim.nla_tracks):
+        return False
+    if anim.action is not None:
+        for fcu in anim.action.fcurves:
+            if len(fcu.modifiers):
+                return False
+    return True
+
+
+def cacheable(ob):
+    """Drone moves and changes color only by its own keyframes"""
+    if ob.parent is not None or len(ob.constraints):
+        return False
+    mat = ob.active_material
+    return mat is not None and _own_keyframes(ob) and _own_keyframes(mat)
+
+
+def _animated(id_data):
+    anim = id_data.animation_data
+    if anim is None or anim.action is None:
+        return set()
+    return set((fcu.data_path, fcu.array_index) for fcu in anim.action.fcurves if not fcu.mute)
+
+
+def _hash_static(sha, id_data, paths):
+    # animated values depend on the current frame, their keyframes are hashed instead
+    animated = _animated(id_data)
+    for path in paths:
+        values = [v for i, v in enumerate(getattr(id_data, path)) if (path, i) not in animated]
+        sha.update(("%s%r" % (path, values)).encode())
+
+
+def _hash_keyframes(sha, anim):
+    # keyframes, handles and easing of every F-Curve
+    if anim is None or anim.action is None:
+        return
+    for fcu in anim.action.fcurves:
+        sha.update(("%s[%d]%s%s" % (fcu.data_path, fcu.array_index, fcu.extrapolation, fcu.mute)).encode())
+        points = fcu.keyframe_points
+        for attr in ('co', 'handle_left', 'handle_right'):
+            data = np.empty(len(points) * 2, dtype=np.float32)
+            points.foreach_get(attr, data)
+            sha.update(data.tobytes())
+        for attr in ('back', 'amplitude', 'period'):
+            data = np.empty(len(points), dtype=np.float32)
+            points.foreach_get(attr, data)
+            sha.update(data.tobytes())
+        sha.update("".join(k.interpolation + k.easing for k in points).encode())
+
+
+def bake_key(scene, drone_show):
+    """Hash of drone animation data, framerate and waypoint frame range,
+    None when some drone is moved by anything else than its own keyframes"""
+    sha = hashlib.sha1()
+    sha.update(repr((
+            scene.render.fps,
+            scene.frame_start,
+            scene.frame_end,
+            drone_show.show_length,
+            drone_show.max_waypoints,
+            drone_show.rows_x,
+            drone_show.rows_y,
+            )).encode())
+
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    for i in range(0, number_of_uavs):
+        ob = bpy.data.objects['drone_' + str(i)]
+        if not cacheable(ob):
+            return None
+        sha.update(ob.rotation_mode.encode())
+        _hash_static(sha, ob, TRANSFORM)
+        _hash_keyframes(sha, ob.animation_data)
+        mat = ob.active_material
+        _hash_static(sha, mat, ('diffuse_color',))
+        _hash_keyframes(sha, mat.animation_data)
+    return sha.hexdigest()
+
+
+def results_key(scene, drone_show):
+    """Bake key extended with the check limits, None when not cacheable"""
+    key = bake_key(scene, drone_show)
+    if key is None:
+        return None
+    sha = hashlib.sha1(key.encode())
+    sha.update(repr((
+            drone_show.distance_min,
+            drone_show.velocity_max,
+            drone_show.use_adaptive,
+            drone_show.adaptive_bound,
+            drone_show.use_downwash,
+            drone_show.distance_min_v,
+            drone_show.use_analytic_velocity,
+            )).encode())
+    return sha.hexdigest()
+
+
+def _load(name):
+    filepath = os.path.join(cache_dir(), name)
+    if not os.path.exists(filepath):
+        return None
+    # last access time is kept in mtime for LRU eviction
+    os.utime(filepath, None)
+    return filepath
+
+
+def evict(cache_size):
+    """Remove least recently used entries until cache is below cache_size MB"""
+    path = cache_dir()
+    entries = []
+    for name in os.listdir(path):
+        stat = os.stat(os.path.join(path, name))
+        entries.append((stat.st_mtime, stat.st_size, name))
+    entries.sort()
+
+    total = sum(size for mtime, size, name in entries)
+    while entries and total > cache_size * 1024 * 1024:
+        mtime, size, name = entries.pop(0)
+        os.remove(os.path.join(path, name))
+        total -= size
+
+
+def _store(name, write, cache_size):
+    path = cache_dir()
+    try:
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, name), 'wb') as f:
+            write(f)
+        evict(cache_size)
+    except OSError:
+        import traceback
+        traceback.print_exc()
+
+
+def load_bake(key):
+    filepath = _load(key + ".npz")
+    if filepath is None:
+        return None
+    with np.load(filepath) as data:
+        return data['positions'], data['colors']
+
+
+def store_bake(key, positions, colors, cache_size):
+    _store(key + ".npz",
+           lambda f: np.savez(f, positions=positions, colors=colors),
+           cache_size)
+
+
+def load_results(key):
+    filepath = _load(key + ".json")
+    if filepath is None:
+        return None
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def store_results(key, info, cache_size):
+    _store(key + ".json",
+           lambda f: f.write(json.dumps(info).encode()),
+           cache_size)
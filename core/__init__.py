@@ -0,0 +1,26 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Drone Show Core
+# trajectory analysis and PATH encoding on numpy arrays, no bpy needed
+#
+# the operators bake the scene to arrays and hand them to this package,
+# outside Blender put the addon directory on sys.path and "import core"
+
+from . import (
+        trajectory,
+        stats,
+        proximity,
+        velocity,
+        geofence,
+        pathfile,
+        ledtrack,
+        stream,
+        separation,
+        pointcache,
+        bezier,
+        )
@@ -0,0 +1,222 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Keyframe Velocity
+# drone speed straight from location F-Curve keyframes, without evaluating
+# the scene. All keyframes of all drones are handled in one batch, frames
+# of drone d are shifted by d * span so one searchsorted finds every segment
+
+import numpy as np
+
+CONSTANT = 0
+LINEAR = 1
+BEZIER = 2
+
+# bisection steps to find the bezier parameter of a frame
+SOLVE_STEPS = 40
+# frames before a key where the arriving speed is sampled
+LEFT_LIMIT = 1e-6
+# samples between neighboring keys when searching the peak speed
+SUBDIVISIONS = 32
+
+
+class Channel:
+    """Keyframes of one location axis for all drones, sorted by drone and frame.
+    drone (keys,), co, handle_left, handle_right (keys, 2), interpolation (keys,)"""
+
+    def __init__(self, drone, co, handle_left, handle_right, interpolation):
+        self.drone = drone
+        self.co = co
+        self.handle_left = handle_left
+        self.handle_right = handle_right
+        self.interpolation = interpolation
+
+
+def _bezier(p0, p1, p2, p3, u):
+    v = 1.0 - u
+    return v * v * v * p0 + 3.0 * v * v * u * p1 + 3.0 * v * u * u * p2 + u * u * u * p3
+
+
+def _bezier_derivative(p0, p1, p2, p3, u):
+    v = 1.0 - u
+    return 3.0 * v * v * (p1 - p0) + 6.0 * v * u * (p2 - p1) + 3.0 * u * u * (p3 - p2)
+
+
+def _correct_handles(p0, p1, p2, p3):
+    # like Blender, handles are shortened so frame stays monotonic in a segment
+    len1 = np.maximum(p1[:, 0] - p0[:, 0], 0.0)
+    len2 = np.maximum(p3[:, 0] - p2[:, 0], 0.0)
+    length = p3[:, 0] - p0[:, 0]
+    total = len1 + len2
+    fac = np.where(total > length, length / np.where(total > 0, total, 1.0), 1.0)[:, None]
+    h1 = (p1 - p0) * fac
+    h2 = (p2 - p3) * fac
+    h1[:, 0] = np.maximum(h1[:, 0], 0.0)
+    h2[:, 0] = np.minimum(h2[:, 0], 0.0)
+    return p0 + h1, p3 + h2
+
+
+def evaluate(channel, static, drone, t, offset, span):
+    """Return value and derivative per frame of channel for queries (drone, t),
+    static (drones,) is used for drones without keyframes. Extrapolation is constant"""
+    value = static[drone].astype(np.float64)
+    derivative = np.zeros(len(t))
+    co = channel.co
+    keys = len(co)
+    if not keys:
+        return value, derivative
+
+    key_drone = channel.drone
+    key_global = co[:, 0] - offset + key_drone * span
+    idx = np.searchsorted(key_global, t - offset + drone * span, 'right') - 1
+    safe = np.clip(idx, 0, keys - 1)
+    after = (idx >= 0) & (key_drone[safe] == drone)
+    nxt = np.clip(idx + 1, 0, keys - 1)
+    has_next = (idx + 1 < keys) & (key_drone[nxt] == drone)
+
+    # before the first key of a drone, after its last key, inside a segment
+    before = ~after & has_next
+    value[before] = co[nxt[before], 1]
+    inside = after & has_next
+    value[after & ~has_next] = co[safe[after & ~has_next], 1]
+
+    q = np.nonzero(inside)[0]
+    a = safe[q]
+    b = a + 1
+    mode = channel.interpolation[a]
+    p0 = co[a]
+    p3 = co[b]
+
+    const = mode == CONSTANT
+    value[q[const]] = p0[const, 1]
+
+    linear = (mode != CONSTANT) & (mode != BEZIER)
+    slope = (p3[linear, 1] - p0[linear, 1]) / (p3[linear, 0] - p0[linear, 0])
+    value[q[linear]] = p0[linear, 1] + slope * (t[q[linear]] - p0[linear, 0])
+    derivative[q[linear]] = slope
+
+    bez = mode == BEZIER
+    if bez.any():
+        p0 = p0[bez]
+        p3 = p3[bez]
+        p1, p2 = _correct_handles(p0, channel.handle_right[a[bez]], channel.handle_left[b[bez]], p3)
+        tq = t[q[bez]]
+        lo = np.zeros(len(tq))
+        hi = np.ones(len(tq))
+        for i in range(SOLVE_STEPS):
+            u = 0.5 * (lo + hi)
+            below = _bezier(p0[:, 0], p1[:, 0], p2[:, 0], p3[:, 0], u) < tq
+            lo = np.where(below, u, lo)
+            hi = np.where(below, hi, u)
+        u = 0.5 * (lo + hi)
+        dx = _bezier_derivative(p0[:, 0], p1[:, 0], p2[:, 0], p3[:, 0], u)
+        dy = _bezier_derivative(p0[:, 1], p1[:, 1], p2[:, 1], p3[:, 1], u)
+        value[q[bez]] = _bezier(p0[:, 1], p1[:, 1], p2[:, 1], p3[:, 1], u)
+        # vertical tangent at a zero length handle, fall back to the chord slope
+        chord = (p3[:, 1] - p0[:, 1]) / (p3[:, 0] - p0[:, 0])
+        derivative[q[bez]] = np.where(dx > 1e-9, dy / np.where(dx > 1e-9, dx, 1.0), chord)
+
+    return value, derivative
+
+
+def frame_range(channels, frame_start, frame_end):
+    """Return frame offset and per drone span used to batch all drones"""
+    frames = [c.co[:, 0] for c in channels if len(c.co)]
+    lo = min([frame_start] + [f.min() for f in frames]) - 1.0
+    hi = max([frame_end] + [f.max() for f in frames]) + 1.0
+    return lo, np.ceil(hi - lo) + 1.0
+
+
+def sample_frames(channels, number_of_uavs, frame_start, frame_end, subdivisions, offset, span):
+    """Return (drone, frame) samples, every interval between keyframes of any
+    axis inside the frame range is split into subdivisions"""
+    drones = np.arange(number_of_uavs)
+    t = [drones * span + frame_start - offset, drones * span + frame_end - offset]
+    for c in channels:
+        keep = (c.co[:, 0] > frame_start) & (c.co[:, 0] < frame_end)
+        t.append(c.drone[keep] * span + c.co[keep, 0] - offset)
+    t = np.unique(np.concatenate(t))
+    drone = np.floor(t / span).astype(int)
+
+    same = drone[1:] == drone[:-1]
+    a = t[:-1][same]
+    b = t[1:][same]
+    s = np.arange(subdivisions) / subdivisions
+    # keys give the speed leaving them, b - LEFT_LIMIT the speed arriving
+    samples = np.concatenate(((a[:, None] + (b - a)[:, None] * s).ravel(), b - LEFT_LIMIT, t))
+    samples = np.unique(samples)
+    drone = np.floor(samples / span).astype(int)
+    return drone, samples - drone * span + offset
+
+
+def _speeds(channels, static, drone, t, offset, span, fps):
+    velocity = np.zeros((len(t), 3))
+    for axis, c in enumerate(channels):
+        velocity[:, axis] = evaluate(c, static[:, axis], drone, t, offset, span)[1]
+    return np.sqrt((velocity ** 2).sum(axis=1)) * fps
+
+
+def _highest(drone, speed):
+    # index of the highest sample of every drone that has samples
+    order = np.lexsort((-speed, drone))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = drone[order][1:] != drone[order][:-1]
+    return order[first]
+
+
+def peak_speeds(channels, static, frame_start, frame_end, fps, subdivisions=SUBDIVISIONS):
+    """Return per drone peak speed (m/s) and its frame, channels and static
+    locations (drones, 3) are for the x, y and z axis. Jumps of constant
+    interpolation give infinite speed on the frame of the jump"""
+    number_of_uavs = len(static)
+    offset, span = frame_range(channels, frame_start, frame_end)
+    drone, t = sample_frames(channels, number_of_uavs, frame_start, frame_end, subdivisions, offset, span)
+    speed = _speeds(channels, static, drone, t, offset, span, fps)
+
+    # subdivide once more between the neighbors of the highest sample,
+    # samples are sorted by drone and frame
+    top = _highest(drone, speed)
+    prev = np.maximum(top - 1, 0)
+    nxt = np.minimum(top + 1, len(t) - 1)
+    lo = np.where(drone[prev] == drone[top], t[prev], t[top])
+    hi = np.where(drone[nxt] == drone[top], t[nxt], t[top])
+    s = np.arange(1, 2 * subdivisions) / (2 * subdivisions)
+    fine_t = (lo[:, None] + (hi - lo)[:, None] * s).ravel()
+    fine_drone = np.repeat(drone[top], len(s))
+    fine_speed = _speeds(channels, static, fine_drone, fine_t, offset, span, fps)
+
+    drone = np.concatenate((drone[top], fine_drone))
+    t = np.concatenate((t[top], fine_t))
+    speed = np.concatenate((speed[top], fine_speed))
+    top = _highest(drone, speed)
+
+    peak = np.zeros(number_of_uavs)
+    frame = np.full(number_of_uavs, float(frame_start))
+    peak[drone[top]] = speed[top]
+    frame[drone[top]] = t[top]
+
+    # constant interpolation jumps to the next key value, speed is infinite
+    for c in channels:
+        jump = np.nonzero((c.drone[:-1] == c.drone[1:]) & (c.interpolation[:-1] == CONSTANT) &
+                          (c.co[:-1, 1] != c.co[1:, 1]) &
+                          (c.co[1:, 0] > frame_start) & (c.co[1:, 0] <= frame_end))[0][::-1]
+        peak[c.drone[jump]] = np.inf
+        frame[c.drone[jump]] = c.co[jump + 1, 0]
+    return peak, frame
+
+
+def positions(channels, static, frames):
+    """Return (frames, drones, 3) locations on the given frames"""
+    number_of_uavs = len(static)
+    offset, span = frame_range(channels, frames.min(), frames.max())
+    drone = np.repeat(np.arange(number_of_uavs), len(frames))
+    t = np.tile(frames, number_of_uavs)
+
+    pos = np.empty((number_of_uavs, len(frames), 3))
+    for axis, c in enumerate(channels):
+        pos[:, :, axis] = evaluate(c, static[:, axis], drone, t, offset, span)[0].reshape(number_of_uavs, -1)
+    return pos.transpose(1, 0, 2)
@@ -0,0 +1,18 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Geofence Check
+
+import numpy as np
+
+
+def check_geofence(pos, radius, height):
+    """Return set of (i, waypoint) outside the cylinder radius x height"""
+    r2 = (pos[:, :, :2] ** 2).sum(axis=2)
+    z = pos[:, :, 2]
+    w, i = np.nonzero((r2 > radius * radius) | (z > height) | (z < 0.0))
+    return set(zip(i.tolist(), w.tolist()))
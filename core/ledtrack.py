@@ -0,0 +1,79 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# LED Track Encoding
+# color change events, one LED file per drone
+
+import os
+import numpy as np
+
+# one LED event is time (ms from show start) and r, g, b
+LED_EVENT = np.dtype([
+    ('time', '<u4'),
+    ('r', 'u1'),
+    ('g', 'u1'),
+    ('b', 'u1'),
+    ('pad', 'u1'),
+    ])
+
+
+def led_name(filepath, i):
+    return os.path.join(filepath, 'APM-' + str(i+1) + '.LED')
+
+
+def led_times(blender_frame_rate, show_start, frame_end, led_fps):
+    """Return sample times (s from show start) and matching fractional frames,
+    show_start is the frame of the first PATH waypoint so both tracks share time 0"""
+    show_time = (frame_end - show_start) / blender_frame_rate
+    times = np.arange(0, int(show_time * led_fps)) / led_fps
+    return times, show_start + times * blender_frame_rate
+
+
+def compress_colors(colors, tolerance, last=None):
+    """Return (sample, drone) indices where a drone color moves more than
+    tolerance away from the last stored event. last (drones, 3) holds the
+    stored colors of previous windows and is updated in place, without it
+    the first sample is always stored"""
+    if last is None:
+        last = np.full(colors.shape[1:], np.inf)
+    samples = [np.zeros(0, dtype=np.intp)]
+    drones = [np.zeros(0, dtype=np.intp)]
+    for s in range(0, len(colors)):
+        changed = np.nonzero(np.abs(colors[s] - last).max(axis=1) > tolerance)[0]
+        if len(changed):
+            last[changed] = colors[s, changed]
+            samples.append(np.full(len(changed), s, dtype=np.intp))
+            drones.append(changed)
+    return np.concatenate(samples), np.concatenate(drones)
+
+
+def led_events(times, colors, index, i):
+    """Build LED_EVENT records for drone i from its event sample indices"""
+    events = np.zeros(len(index), dtype=LED_EVENT)
+    events['time'] = np.round(times[index] * 1000)
+    rgb = (colors[index, i] * 255).astype(np.uint8)
+    events['r'] = rgb[:, 0]
+    events['g'] = rgb[:, 1]
+    events['b'] = rgb[:, 2]
+    return events
+
+
+def write_leds(filepath, times, colors, tolerance, last=None, append=False):
+    """Compress (samples, drones, 3) colors sampled at times (s) and write
+    APM-*.LED file for every drone, or append the events of one window
+    when last stored colors are kept between windows. Returns number of events"""
+    number_of_uavs = colors.shape[1]
+    samples, drones = compress_colors(colors, tolerance, last)
+
+    # group events by drone, stable sort keeps them in time order
+    order = np.argsort(drones, kind='stable')
+    split = np.cumsum(np.bincount(drones, minlength=number_of_uavs))[:-1]
+    mode = 'ab' if append else 'wb'
+    for i, index in enumerate(np.split(samples[order], split)):
+        with open(led_name(filepath, i), mode) as f:
+            led_events(times, colors, index, i).tofile(f)
+    return len(samples)
@@ -0,0 +1,65 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# PATH File Encoding
+# one record per waypoint, x, y, z (cm), r, g, b as little endian int16
+
+import os
+import numpy as np
+
+PATH_RECORD = 6
+PATH_MAX = 32767
+
+
+def path_name(filepath, i):
+    return os.path.join(filepath, 'APM-' + str(i+1) + '.PATH')
+
+
+def encode_paths(positions, colors):
+    """Return (waypoints, drones, 6) int16 records, positions and colors
+    are truncated like int(). Raises ValueError when out of int16 range"""
+    # scaled position, truncated to centimeters
+    xyz = (positions * 100).astype(np.int64)
+    if len(xyz) and np.abs(xyz).max() > PATH_MAX:
+        raise ValueError("positions must stay within 327 m from origin")
+
+    records = np.empty(xyz.shape[:2] + (PATH_RECORD,), dtype='<i2')
+    records[:, :, :3] = xyz
+    records[:, :, 3:] = (np.clip(colors, 0.0, 1.0).astype(np.float64) * 255).astype(np.int64)
+    return records
+
+
+def write_paths(filepath, records, append=False):
+    """Write APM-*.PATH file for every drone, or append records to it"""
+    # files are reopened per call, shows can have more drones than
+    # the process is allowed to keep open
+    mode = 'ab' if append else 'wb'
+    for i in range(0, records.shape[1]):
+        with open(path_name(filepath, i), mode) as f:
+            np.ascontiguousarray(records[:, i]).tofile(f)
+
+
+def read_paths(filepath, number_of_uavs):
+    """Memory-map APM-*.PATH files, returns list of (waypoints, 6) int16 arrays"""
+    paths = []
+    for i in range(0, number_of_uavs):
+        name = path_name(filepath, i)
+        if os.path.getsize(name) == 0:
+            paths.append(np.zeros((0, PATH_RECORD), dtype='<i2'))
+            continue
+        data = np.memmap(name, dtype='<i2', mode='r')
+        paths.append(data[:len(data) - len(data) % PATH_RECORD].reshape(-1, PATH_RECORD))
+    return paths
+
+
+def path_positions(paths):
+    """Stack PATH records to (waypoints, drones, 3) positions in meters"""
+    waypoints = min(len(p) for p in paths)
+    pos = np.empty((waypoints, len(paths), 3), dtype=np.float64)
+    for i, p in enumerate(paths):
+        pos[:, i] = p[:waypoints, :3]
+    return pos / 100.0
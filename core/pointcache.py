@@ -0,0 +1,51 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Point Cache Files
+# PC2 vertex positions as read by the Mesh Cache modifier, LED colors as .npy
+
+import numpy as np
+
+PC2_HEADER = np.dtype([
+    ('signature', 'S12'),
+    ('version', '<i4'),
+    ('points', '<i4'),
+    ('start_frame', '<f4'),
+    ('sample_rate', '<f4'),
+    ('samples', '<i4'),
+    ])
+
+
+def write_pc2(filename, positions, start_frame):
+    """Write (frames, points, 3) positions, one sample per frame"""
+    header = np.zeros(1, dtype=PC2_HEADER)
+    header['signature'] = b'POINTCACHE2\0'
+    header['version'] = 1
+    header['points'] = positions.shape[1]
+    header['start_frame'] = start_frame
+    header['sample_rate'] = 1.0
+    header['samples'] = positions.shape[0]
+    with open(filename, 'wb') as f:
+        header.tofile(f)
+        positions.astype('<f4').tofile(f)
+
+
+def read_pc2(filename):
+    """Memory-map PC2 file, returns start frame and (frames, points, 3) positions"""
+    header = np.fromfile(filename, dtype=PC2_HEADER, count=1)[0]
+    positions = np.memmap(filename, dtype='<f4', mode='r', offset=PC2_HEADER.itemsize,
+                          shape=(int(header['samples']), int(header['points']), 3))
+    return float(header['start_frame']), positions
+
+
+def write_colors(filename, colors):
+    """Write (frames, points, 3) LED colors"""
+    np.save(filename, colors.astype(np.float32))
+
+
+def read_colors(filename):
+    return np.load(filename, mmap_mode='r')
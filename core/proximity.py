@@ -0,0 +1,130 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Proximity Check
+
+import numpy as np
+
+from . import separation
+
+# waypoints checked at once by the proximity grid
+BLOCK_SIZE = 256
+
+
+def downwash_scale(distance_min, distance_min_v):
+    """Scale mapping the separation ellipsoid to a sphere of radius distance_min"""
+    return np.array([1.0, 1.0, distance_min / distance_min_v])
+
+
+def check_distance(pos, distance_min, distance_min_v=None):
+    """Return set of (i, k, waypoint) with drones i < k closer than distance_min,
+    or inside the downwash ellipsoid when distance_min_v is given, distance_min
+    horizontal and distance_min_v vertical radius"""
+    found = set()
+    scale = np.ones(3)
+    if distance_min_v is not None:
+        scale = downwash_scale(distance_min, distance_min_v)
+    for w0 in range(0, pos.shape[0], BLOCK_SIZE):
+        # grid cells on scaled positions are distance_min wide and
+        # distance_min_v high, the shape of the ellipsoid
+        w, i, k, d = separation.grid_pairs(pos[w0:w0 + BLOCK_SIZE] * scale, distance_min)
+        found.update(zip(i.tolist(), k.tolist(), (w + w0).tolist()))
+    return found
+
+
+def distance_warnings(pos, distance_min, distance_min_v=None):
+    """Return sorted list of (i, k, waypoint, distance) closer than distance_min"""
+    warnings = []
+    for i, k, w in sorted(check_distance(pos, distance_min, distance_min_v)):
+        d = np.sqrt(((pos[w, k] - pos[w, i]) ** 2).sum())
+        warnings.append((i, k, w, d))
+    return warnings
+
+
+def adaptive_distance_warnings(position_at, waypoints, distance_min, max_step, distance_min_v=None):
+    """Conservative advancement over the waypoints, position_at(w) returns
+    (drones, 3) positions and max_step the most a drone (array per drone
+    or one for all) moves between two waypoints. After each evaluated
+    waypoint the next ones are skipped while no pair could have closed
+    its margin to distance_min, so the warnings match the full scan.
+    A drone found further from its last evaluated position than max_step
+    allows breaks that promise, the skipped waypoints are then scanned one
+    by one. Returns warnings (i, k, waypoint, distance), evaluated
+    waypoints and sorted drones that moved faster than max_step"""
+    scale = np.ones(3)
+    if distance_min_v is not None:
+        # margins are worked out in the space where the ellipsoid is a sphere
+        scale = downwash_scale(distance_min, distance_min_v)
+        max_step = max_step * max(1.0, scale[2])
+
+    cell = separation.separation_cell(distance_min)
+    warnings = []
+    evaluated = 0
+    too_fast = set()
+    step = None
+    last_w = None
+    last_pos = None
+    # warnings repeated on the skipped waypoints, none unless nothing moves
+    repeat = []
+    rescan_until = -1
+    w = 0
+    while w < waypoints:
+        real = position_at(w)
+        pos = real * scale
+        evaluated += 1
+        if step is None:
+            step = np.broadcast_to(max_step, pos.shape[:1]).astype(np.float64)
+            bound = step + step.max()
+
+        if last_w is not None and w - last_w > 1:
+            moved = np.sqrt(((pos - last_pos) ** 2).sum(axis=1))
+            fast = np.nonzero(moved > (w - last_w) * step * (1.0 + 1e-9) + 1e-9)[0]
+            if len(fast):
+                too_fast.update(fast.tolist())
+                # w is evaluated again at the end of the rescan, counted once
+                evaluated -= 1
+                rescan_until = w
+                w = last_w + 1
+                continue
+            for skipped in range(last_w + 1, w):
+                warnings.extend((ii, kk, skipped, d) for ii, kk, d in repeat)
+        last_w = w
+        last_pos = pos
+
+        wp, i, k, d = separation.grid_pairs(pos[None], cell)
+        near = d < distance_min
+        current = []
+        for ii, kk in sorted(zip(i[near].tolist(), k[near].tolist())):
+            current.append((ii, kk, np.sqrt(((real[kk] - real[ii]) ** 2).sum())))
+        warnings.extend((ii, kk, w, d) for ii, kk, d in current)
+
+        repeat = []
+        if w < rescan_until:
+            w += 1
+            continue
+
+        # nearest neighbors outside the grid cell are at least a cell away
+        nearest = np.full(pos.shape[0], cell)
+        np.minimum.at(nearest, i, d)
+        np.minimum.at(nearest, k, d)
+        margin = nearest - distance_min
+
+        # pair i, k closes at most max_step[i] + max_step[k] per waypoint
+        moving = bound > 0
+        if not moving.any():
+            # nothing moves, the waypoints up to the last one repeat this one
+            repeat = current
+            w = max(w + 1, waypoints - 1)
+        elif (margin[moving] <= 0).any():
+            w += 1
+        else:
+            # the last waypoint is always evaluated, it confirms the final skip
+            w = min(w + max(1, int(np.ceil((margin[moving] / bound[moving]).min()))),
+                    max(w + 1, waypoints - 1))
+
+    warnings.sort()
+    return warnings, evaluated, sorted(too_fast)
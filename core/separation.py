@@ -0,0 +1,131 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Separation Timeline
+# nearest neighbor distances per waypoint with a uniform grid broad phase
+
+import itertools
+import numpy as np
+
+# neighbor cells in one half of the 3x3x3 block, the other half is
+# covered when the neighbor cell does the lookup
+HALF_SHELL = [o for o in itertools.product((-1, 0, 1), repeat=3) if o > (0, 0, 0)]
+# histogram bins per cell
+HISTOGRAM_BINS = 10
+# waypoints in one grid pass, candidate pairs grow with drones x waypoints
+BLOCK_SIZE = 32
+
+
+def separation_cell(distance_min):
+    """Grid cell size, nearest neighbors up to twice the limit are resolved"""
+    return max(2.0 * distance_min, 1.0)
+
+
+def grid_pairs(pos, cell):
+    """Return waypoint, drone i, drone k (i < k) and distance of all pairs
+    closer than cell, pos is (waypoints, drones, 3)"""
+    waypoints, number_of_uavs = pos.shape[:2]
+    if not waypoints or number_of_uavs < 2:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, np.zeros(0)
+
+    # cell coordinates start at 1 so -1 offsets stay in range
+    c = np.floor(pos / cell).astype(np.int64)
+    c -= c.min(axis=(0, 1)) - 1
+    dims = c.max(axis=(0, 1)) + 2
+    w = np.repeat(np.arange(waypoints), number_of_uavs)
+    c = c.reshape(-1, 3)
+    key = ((w * dims[0] + c[:, 0]) * dims[1] + c[:, 1]) * dims[2] + c[:, 2]
+
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    flat = pos.reshape(-1, 3)
+
+    found_a = []
+    found_b = []
+    for ox, oy, oz in [(0, 0, 0)] + HALF_SHELL:
+        neighbor = key + (ox * dims[1] + oy) * dims[2] + oz
+        lo = np.searchsorted(sorted_key, neighbor, 'left')
+        hi = np.searchsorted(sorted_key, neighbor, 'right')
+        counts = hi - lo
+        total = counts.sum()
+        if not total:
+            continue
+        # expand every [lo, hi) range into candidate pairs
+        a = np.repeat(np.arange(len(key)), counts)
+        b = order[np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(total)]
+        if (ox, oy, oz) == (0, 0, 0):
+            keep = a < b
+            a = a[keep]
+            b = b[keep]
+        found_a.append(a)
+        found_b.append(b)
+
+    if not found_a:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, np.zeros(0)
+
+    a = np.concatenate(found_a)
+    b = np.concatenate(found_b)
+    d = np.sqrt(((flat[a] - flat[b]) ** 2).sum(axis=1))
+    near = d < cell
+    a = a[near]
+    b = b[near]
+    i = np.minimum(a, b) % number_of_uavs
+    k = np.maximum(a, b) % number_of_uavs
+    return a // number_of_uavs, i, k, d[near]
+
+
+def separation_timeline(pos, cell):
+    """Return per waypoint minimum separation, closest pair (waypoints, 2)
+    and per drone nearest neighbor distance (waypoints, drones). Nearest
+    neighbors further than cell are inf, the minimum is always exact"""
+    waypoints, number_of_uavs = pos.shape[:2]
+    min_distance = np.full(waypoints, np.inf)
+    pair = np.full((waypoints, 2), -1, dtype=np.intp)
+    nearest = np.full((waypoints, number_of_uavs), np.inf)
+
+    for w0 in range(0, waypoints, BLOCK_SIZE):
+        block = np.arange(w0, min(w0 + BLOCK_SIZE, waypoints))
+        w, i, k, d = grid_pairs(pos[block], cell)
+        np.minimum.at(nearest, (block[w], i), d)
+        np.minimum.at(nearest, (block[w], k), d)
+        _closest(w, i, k, d, min_distance, pair, block)
+
+    # waypoints without any pair inside one cell retry with larger cells
+    missing = np.nonzero(np.isinf(min_distance))[0]
+    size = cell
+    while len(missing) and number_of_uavs > 1:
+        size *= 2
+        for w0 in range(0, len(missing), BLOCK_SIZE):
+            block = missing[w0:w0 + BLOCK_SIZE]
+            w, i, k, d = grid_pairs(pos[block], size)
+            _closest(w, i, k, d, min_distance, pair, block)
+        missing = missing[np.isinf(min_distance[missing])]
+
+    return min_distance, pair, nearest
+
+
+def _closest(w, i, k, d, min_distance, pair, waypoints):
+    # first pair of each waypoint after sorting by distance is the closest
+    order = np.lexsort((d, w))
+    w = w[order]
+    first = np.ones(len(w), dtype=bool)
+    first[1:] = w[1:] != w[:-1]
+    index = order[first]
+    target = waypoints[w[first]]
+    min_distance[target] = d[index]
+    pair[target, 0] = i[index]
+    pair[target, 1] = k[index]
+
+
+def separation_histogram(nearest, bins):
+    """Histogram of nearest neighbor distances, last count is for
+    distances beyond the last bin edge"""
+    counts, edges = np.histogram(nearest[np.isfinite(nearest)], bins=bins)
+    overflow = nearest.size - counts.sum()
+    return np.append(counts, overflow), edges
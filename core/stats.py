@@ -0,0 +1,72 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Show Statistics
+
+import numpy as np
+
+
+def show_statistics(blender_frame_rate, show_length, number_of_uavs, drone_fps, step, waypoints):
+    """Return statistics report lines"""
+    show_length_h = (float(show_length/blender_frame_rate)/3600) #length in hours
+
+    hours = int(show_length_h) #hours to display
+    minutes = (show_length_h*60) % 60 #minutes to display
+    seconds = (show_length_h*3600) % 60 #seconds to display
+
+    return [
+        "Blender frame rate: " + str(blender_frame_rate),
+        "Calculating waypoints every %g frames" % step,
+        ("Num UAVs: %d " % number_of_uavs),
+        ("Show Length: %d:%02d.%02d (h:m.s) " % (hours, minutes, seconds)),
+        ("autopilot framerate: %d fps " % drone_fps),
+        ("%d waypoints will be stored in the drone" % waypoints),
+        ]
+
+
+# simple multirotor power model for the energy estimate
+HOVER_POWER = 100.0 # W
+DRAG_POWER = 5.0 # W per (m/s)^2
+DRONE_MASS = 1.0 # kg
+GRAVITY = 9.81
+
+
+def drone_statistics(pos, drone_fps):
+    """Return per drone path length (m), peak speed (m/s) and energy estimate (Wh)"""
+    delta = np.diff(pos, axis=0)
+    steps = np.sqrt((delta ** 2).sum(axis=2))
+    speed = steps * drone_fps
+    climb = np.maximum(delta[:, :, 2], 0.0)
+
+    path_length = steps.sum(axis=0)
+    peak_speed = speed.max(axis=0) if len(speed) else np.zeros(pos.shape[1])
+    # hover and drag power over every waypoint interval plus work against gravity
+    energy = ((HOVER_POWER + DRAG_POWER * speed ** 2) / drone_fps).sum(axis=0)
+    energy += DRONE_MASS * GRAVITY * climb.sum(axis=0)
+    return path_length, peak_speed, energy / 3600.0
+
+
+def write_timeline_csv(filename, frames, min_distance, pair):
+    with open(filename, 'w') as f:
+        f.write("frame,min_distance,drone_a,drone_b\n")
+        for frame, d, (a, b) in zip(frames, min_distance, pair):
+            f.write("%g,%.4f,%d,%d\n" % (frame, d, a, b))
+
+
+def write_histogram_csv(filename, counts, edges):
+    with open(filename, 'w') as f:
+        f.write("from,to,count\n")
+        for lo, hi, n in zip(edges[:-1], edges[1:], counts):
+            f.write("%g,%g,%d\n" % (lo, hi, n))
+        f.write("%g,inf,%d\n" % (edges[-1], counts[-1]))
+
+
+def write_drones_csv(filename, path_length, peak_speed, energy):
+    with open(filename, 'w') as f:
+        f.write("drone,path_length,peak_speed,energy_wh\n")
+        for i, (l, s, e) in enumerate(zip(path_length, peak_speed, energy)):
+            f.write("%d,%.3f,%.3f,%.3f\n" % (i, l, s, e))
@@ -0,0 +1,48 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Rolling Checks
+# proximity and velocity over consecutive waypoint windows of one show
+
+import numpy as np
+
+from . import (
+        proximity,
+        velocity,
+        )
+
+
+class RollingChecks:
+    """Keeps only the last waypoint of the previous window, proximity
+    needs nothing but the current frame"""
+
+    def __init__(self, drone_fps, distance_min, velocity_max, distance_min_v=None):
+        self.drone_fps = drone_fps
+        self.distance_min = distance_min
+        self.distance_min_v = distance_min_v
+        self.velocity_max = velocity_max
+        self.last = None
+
+    def update(self, traj):
+        """Check next window, returns distance warnings (i, k, frame, distance)
+        and velocity warnings (i, frame, speed)"""
+        frames = traj.frames
+        distance = [(i, k, frames[w], d) for i, k, w, d in
+                    proximity.distance_warnings(traj.positions, self.distance_min, self.distance_min_v)]
+
+        if self.last is None:
+            pos = traj.positions
+            offset = 0
+        else:
+            pos = np.concatenate((self.last[None], traj.positions))
+            offset = 1
+        speed = [(i, frames[w - offset], s) for i, w, s in
+                 velocity.velocity_warnings(pos, self.drone_fps, self.velocity_max)]
+
+        if len(traj.positions):
+            self.last = traj.positions[-1].copy()
+        return distance, speed
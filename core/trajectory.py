@@ -0,0 +1,75 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Trajectory Model
+# waypoint time grid and resampling of whole frame bakes
+
+import math
+import numpy as np
+
+from . import (
+        velocity,
+        )
+
+
+def autopilot_fps(blender_frame_rate, show_length, max_waypoints):
+    return min(4 ,math.floor(max_waypoints/(show_length/blender_frame_rate))) #1fps - 4fps
+
+
+def first_waypoint(frame_start, step):
+    """Frame of waypoint 0, time 0 of the exported PATH and LED tracks"""
+    # waypoint grid runs through frame 1 like the old nth frame sampling
+    return frame_start + (1 - frame_start) % step
+
+
+def waypoint_times(blender_frame_rate, frame_start, frame_end, drone_fps):
+    """Return frame step and (fractional) waypoint frames"""
+    # exact step, not rounded to whole frames when fps % drone_fps != 0
+    step = blender_frame_rate / drone_fps
+
+    first = first_waypoint(frame_start, step)
+    # rounded so whole frames don't land just below an integer
+    frames = np.round(np.arange(first, frame_end, step), 9)
+    return step, frames
+
+
+def bake_frames(frames):
+    """Return sorted whole frames needed to interpolate the waypoint frames"""
+    lower = np.floor(frames)
+    upper = lower[frames > lower] + 1
+    return np.unique(np.concatenate((lower, upper))).astype(int)
+
+
+def resample(baked, positions, colors, frames):
+    """Interpolate positions baked on whole frames to the waypoint frames,
+    colors hold the value of the last whole frame"""
+    if not len(frames):
+        return positions[:0], colors[:0]
+    lower = np.floor(frames)
+    t = (frames - lower)[:, None, None]
+    i = np.searchsorted(baked, lower)
+    j = np.minimum(i + 1, len(baked) - 1)
+    return positions[i] * (1.0 - t) + positions[j] * t, colors[i]
+
+
+class Trajectory:
+    """Drone positions (meters) and colors (0..1) as (waypoints, drones, 3)
+    arrays, sampled on frames at drone_fps"""
+
+    def __init__(self, positions, colors, frames, drone_fps):
+        self.positions = positions
+        self.colors = colors
+        self.frames = frames
+        self.drone_fps = drone_fps
+
+    @property
+    def number_of_uavs(self):
+        return self.positions.shape[1]
+
+    def speeds(self):
+        """Speed towards each waypoint in m/s, (waypoints - 1, drones)"""
+        return velocity.speeds(self.positions, self.drone_fps)
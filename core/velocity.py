@@ -0,0 +1,27 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Velocity Check
+
+import numpy as np
+
+
+def speeds(pos, drone_fps):
+    """Speed towards each waypoint in m/s, (waypoints - 1, drones)"""
+    return np.sqrt((np.diff(pos, axis=0) ** 2).sum(axis=2)) * drone_fps
+
+
+def check_velocity(pos, drone_fps, velocity_max):
+    """Return set of (i, waypoint) where speed to waypoint exceeds velocity_max"""
+    w, i = np.nonzero(speeds(pos, drone_fps) > velocity_max)
+    return set(zip(i.tolist(), (w + 1).tolist()))
+
+
+def velocity_warnings(pos, drone_fps, velocity_max):
+    """Return sorted list of (i, waypoint, speed) above velocity_max"""
+    s = speeds(pos, drone_fps)
+    return [(i, w, s[w-1, i]) for i, w in sorted(check_velocity(pos, drone_fps, velocity_max))]
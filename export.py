@@ -10,11 +10,72 @@ Based on 3D Print Toolbox by Campbell Barton
 
 import bpy
 import os
-import math
+import numpy as np
+
+from . import (
+        bake,
+        )
+from .core import (
+        pathfile,
+        stream,
+        stats,
+        separation,
+        )
+
+
+def write_stream(filepath, scene, drone_show, info):
+    """Bake, check and write the show window by window in one pass, LED
+    colors are sampled over the same frames as each window"""
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
+    distance_min_v = drone_show.distance_min_v if drone_show.use_downwash else None
+    checks = stream.RollingChecks(drone_fps, drone_show.distance_min, drone_show.velocity_max, distance_min_v)
+
+    print("\nStreaming export, " + str(drone_show.stream_window) + " waypoints per window")
+    info.append("Streaming export, " + str(drone_show.stream_window) + " waypoints per window")
+
+    # create empty PATH file for every object, windows are appended
+    pathfile.write_paths(filepath, pathfile.encode_paths(
+            np.zeros((0, number_of_uavs, 3)), np.zeros((0, number_of_uavs, 3))))
+
+    frame_current = scene.frame_current
+    if drone_show.export_led:
+        from . import led
+        print("Sampling LED colors at " + str(drone_show.led_fps) + " fps")
+        info.append("Sampling LED colors at " + str(drone_show.led_fps) + " fps")
+        led_times, led_frames = led.led_samples(scene, drone_show)
+        drones = led.led_drones(drone_show)
+        last = np.full((number_of_uavs, 3), np.inf)
+        events = 0
+        s0 = 0
+
+    for traj in bake.iter_bake(scene, drone_show, drone_show.stream_window, info):
+        pathfile.write_paths(filepath, pathfile.encode_paths(traj.positions, traj.colors), append=True)
+
+        distance, speed = checks.update(traj)
+        for i, k, f, d in distance:
+            print("Danger! Distance = " + str(round(d,2)) + " m between " + str(i) + " and " + str(k) + " on frame %g" % f)
+            info.append("Danger! Distance = " + str(round(d,2)) + " m between " + str(i) + " and " + str(k) + " on frame %g" % f)
+        for i, f, s in speed:
+            print("Danger! Speed = " + str(round(s,2)) + " m\\s for " + str(i) + " on frame %g" % f)
+            info.append("Danger! Speed = " + str(round(s,2)) + " m\\s for " + str(i) + " on frame %g" % f)
+
+        if drone_show.export_led and len(traj.frames):
+            # LED samples up to the next waypoint window
+            s1 = np.searchsorted(led_frames, traj.frames[-1] + step)
+            if s1 > s0:
+                events += led.write_window(filepath, scene, drones, drone_show,
+                                           led_times[s0:s1], led_frames[s0:s1], last, s0 > 0)
+            s0 = s1
+
+    if drone_show.export_led:
+        # samples after the last waypoint
+        if s0 < len(led_times):
+            events += led.write_window(filepath, scene, drones, drone_show,
+                                       led_times[s0:], led_frames[s0:], last, s0 > 0)
+        led.report_events(info, events, len(led_times) * number_of_uavs)
+    scene.frame_set(frame_current)
 
-#function to clamp rgb values
-def clamp(val, valMin, valMax):
-    return max(min(val, valMax), valMin)
 
 def write_mesh(context, info, report_cb):
     scene = bpy.context.scene
@@ -53,49 +114,38 @@ def write_mesh(context, info, report_cb):
 
 ###############
         
-    show_length = drone_show.show_length
     number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
     blender_frame_rate = scene.render.fps
-    frame_rate = min(4 ,math.floor(drone_show.max_waypoints/(show_length/blender_frame_rate))) #1fps - 4fps
+    frame_rate, step, frames = bake.waypoint_times(scene, drone_show)
 
     print("\nBlender frame rate: " + str(blender_frame_rate))
     print("Target frame rate: " + str(frame_rate))
 
-    if (blender_frame_rate % frame_rate != 0):
-        nth_frame = int(round(blender_frame_rate / frame_rate))
-    else:
-        nth_frame = int(blender_frame_rate / frame_rate)
-
-    print("\nCalculating coordinates for every " + str(nth_frame) + "th frame")
-    info.append("Calculating coordinates for every " + str(nth_frame) + "th frame")
+    print("\nCalculating coordinates every %g frames" % step)
+    info.append("Calculating coordinates every %g frames" % step)
 
     exported = False
+    try:
+        if drone_show.use_streaming:
+            write_stream(filepath, scene, drone_show, info)
+        else:
+            traj = bake.get_bake(scene, drone_show, info)
+            # create PATH file for every object
+            pathfile.write_paths(filepath, pathfile.encode_paths(traj.positions, traj.colors))
+    except ValueError as e:
+        info.append("Drone too far from origin, " + str(e))
+        if report_cb is not None:
+            report_cb({'ERROR'}, "Drone position out of PATH range")
+        return False
+
     for i in range(0, number_of_uavs):
-        ob = bpy.data.objects['drone_' + str(i)]
-        # create PATH file for every object
-        file = open(str(filepath) + '/APM-' + str(i+1) + '.PATH', 'wb')
-        # iterate through frames
-        for f in range(scene.frame_start, scene.frame_end):
-            if (((f-1) % nth_frame) == 0):
-                scene.frame_set(f)
-                # get scaled position
-                x = int(ob.matrix_world.to_translation().x * 100)
-                y = int(ob.matrix_world.to_translation().y * 100)
-                z = int(ob.matrix_world.to_translation().z * 100)
-                # get color
-                r = int(clamp(ob.active_material.diffuse_color.r,0.0,1.0) * 255)
-                g = int(clamp(ob.active_material.diffuse_color.g,0.0,1.0) * 255)
-                b = int(clamp(ob.active_material.diffuse_color.b,0.0,1.0) * 255)
-                file.write((x).to_bytes(2, byteorder='little', signed=True))
-                file.write((y).to_bytes(2, byteorder='little', signed=True))
-                file.write((z).to_bytes(2, byteorder='little', signed=True))
-                file.write((r).to_bytes(2, byteorder='little', signed=True))
-                file.write((g).to_bytes(2, byteorder='little', signed=True))
-                file.write((b).to_bytes(2, byteorder='little', signed=True))
         print("Path APM-"+ str(i+1)+" exported")
         info.append("Path APM-"+ str(i+1)+" exported")
 
-        file.close()
+    # streaming export writes LED files in its window loop
+    if drone_show.export_led and not drone_show.use_streaming:
+        from . import led
+        led.write_led(filepath, scene, drone_show, info)
 
     exported = True
     print("\nFinished path file export")
@@ -110,3 +160,34 @@ def write_mesh(context, info, report_cb):
     else:
         info.append(("%r fail" % os.path.basename(filepath)))
         return False
+
+
+def write_statistics(context, info, report_cb):
+    scene = bpy.context.scene
+    drone_show = scene.drone_show
+
+    filepath = bpy.path.abspath(drone_show.export_path)
+    try:
+        os.makedirs(filepath, exist_ok=True)
+    except:
+        import traceback
+        traceback.print_exc()
+
+    traj = bake.get_bake(scene, drone_show, info)
+
+    # separation needs at least one pair of drones
+    if traj.number_of_uavs > 1:
+        cell = separation.separation_cell(drone_show.distance_min)
+        min_distance, pair, nearest = separation.separation_timeline(traj.positions, cell)
+        counts, edges = separation.separation_histogram(
+                nearest, np.linspace(0.0, cell, separation.HISTOGRAM_BINS + 1))
+        stats.write_timeline_csv(os.path.join(filepath, "separation.csv"), traj.frames, min_distance, pair)
+        stats.write_histogram_csv(os.path.join(filepath, "separation_histogram.csv"), counts, edges)
+
+    path_length, peak_speed, energy = stats.drone_statistics(traj.positions, traj.drone_fps)
+    stats.write_drones_csv(os.path.join(filepath, "drones.csv"), path_length, peak_speed, energy)
+
+    info.append("Statistics exported")
+    if report_cb is not None:
+        report_cb({'INFO'}, "Exported statistics: %r" % filepath)
+    return True
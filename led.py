@@ -0,0 +1,73 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# LED Color Track
+# samples drone material colors at their own rate and stores color change events
+
+import bpy
+import numpy as np
+
+from . import (
+        bake,
+        )
+from .core import (
+        ledtrack,
+        trajectory,
+        )
+
+
+def sample_colors(scene, drones, frames):
+    """Sample material colors on (fractional) frames, returns (samples, drones, 3) colors"""
+    colors = np.empty((len(frames), len(drones), 3), dtype=np.float32)
+    for s, frame in enumerate(frames):
+        f = int(frame)
+        scene.frame_set(f, subframe=frame - f)
+        for i, ob in enumerate(drones):
+            colors[s, i] = ob.active_material.diffuse_color
+    return np.clip(colors, 0.0, 1.0)
+
+
+def led_samples(scene, drone_show):
+    """Return LED sample times (s from show start) and fractional frames"""
+    # LED time 0 is the first waypoint of the PATH files
+    drone_fps, step, waypoint_frames = bake.waypoint_times(scene, drone_show)
+    show_start = trajectory.first_waypoint(scene.frame_start, step)
+    return ledtrack.led_times(scene.render.fps, show_start, scene.frame_end, drone_show.led_fps)
+
+
+def led_drones(drone_show):
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    return [bpy.data.objects['drone_' + str(i)] for i in range(0, number_of_uavs)]
+
+
+def write_window(filepath, scene, drones, drone_show, times, frames, last, append):
+    """Sample colors on frames and write (or append) their LED events, last
+    (drones, 3) stored colors are kept between windows. Returns number of events"""
+    colors = sample_colors(scene, drones, frames)
+    return ledtrack.write_leds(filepath, times, colors, drone_show.led_tolerance, last, append)
+
+
+def report_events(info, events, samples):
+    print("LED events: " + str(events) + " of " + str(samples) + " samples")
+    info.append("LED events: " + str(events) + " of " + str(samples) + " samples")
+
+
+def write_led(filepath, scene, drone_show, info):
+    """Sample LED colors of the whole show and write LED files, streaming
+    export samples them inside its own window loop instead"""
+    print("\nSampling LED colors at " + str(drone_show.led_fps) + " fps")
+    info.append("Sampling LED colors at " + str(drone_show.led_fps) + " fps")
+
+    times, frames = led_samples(scene, drone_show)
+    if not len(times):
+        info.append("Show too short for LED export")
+        return
+
+    drones = led_drones(drone_show)
+    last = np.full((len(drones), 3), np.inf)
+    events = write_window(filepath, scene, drones, drone_show, times, frames, last, False)
+    report_events(info, events, len(times) * len(drones))
@@ -9,6 +9,7 @@ Created by Martins Upitis (martinsh) and Kristaps Brass (kkbrass)
 
 import bpy
 import bmesh
+import numpy as np
 
 from bpy.types import Operator
 from bpy.props import (
@@ -18,6 +19,14 @@ from bpy.props import (
 
 from . import (
         report,
+        bake,
+        )
+from .core import (
+        stats,
+        proximity,
+        velocity,
+        separation,
+        bezier,
         )
 
 
@@ -62,37 +71,78 @@ class DroneCheckStatistics(Operator):
 
     @staticmethod
     def main_check(obj, info):
-        import math
         scene = bpy.context.scene
         drone_show = scene.drone_show
-        show_length = drone_show.show_length
-        max_waypoints = drone_show.max_waypoints
-        blender_frame_rate = scene.render.fps #blender scene framerate
-        show_length_h = (float(show_length/blender_frame_rate)/3600) #length in hours
-        
-        hours = int(show_length_h) #hours to display
-        minutes = (show_length_h*60) % 60 #minutes to display
-        seconds = (show_length_h*3600) % 60 #seconds to display
 
-        drone_fps = min(4 ,math.floor(max_waypoints/(show_length/blender_frame_rate))) #1fps - 4fps
-        drone_waypoints_stored = show_length / (blender_frame_rate/ drone_fps)
+        drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
+
+        info.extend(stats.show_statistics(
+                scene.render.fps, drone_show.show_length,
+                drone_show.rows_x * drone_show.rows_y,
+                drone_fps, step, len(frames)))
+
+        # separation and per drone statistics need the drones
+        if not drone_show.drones_added or len(frames) < 2:
+            return
+
+        traj = bake.get_bake(scene, drone_show, info)
+
+        # separation needs at least one pair of drones
+        if traj.number_of_uavs > 1:
+            cell = separation.separation_cell(drone_show.distance_min)
+            min_distance, pair, nearest = separation.separation_timeline(traj.positions, cell)
+            counts, edges = separation.separation_histogram(
+                    nearest, np.linspace(0.0, cell, separation.HISTOGRAM_BINS + 1))
+
+            w = int(np.argmin(min_distance))
+            info.append("Min separation: %.2f m between %d and %d on frame %g" % (
+                    min_distance[w], pair[w, 0], pair[w, 1], frames[w]))
+            info.append("Frames below min distance: %d" % (min_distance < drone_show.distance_min).sum())
+            for lo, hi, n in zip(edges[:-1], edges[1:], counts):
+                info.append("Nearest %.1f - %.1f m: %d" % (lo, hi, n))
+            info.append("Nearest over %.1f m: %d" % (edges[-1], counts[-1]))
+
+        path_length, peak_speed, energy = stats.drone_statistics(traj.positions, drone_fps)
+        info.append("Path length: %.1f min, %.1f mean, %.1f max m" % (
+                path_length.min(), path_length.mean(), path_length.max()))
+        i = int(np.argmax(peak_speed))
+        info.append("Peak speed: %.2f m/s for %d" % (peak_speed[i], i))
+        i = int(np.argmax(energy))
+        info.append("Energy estimate: %.1f Wh max for %d, %.1f Wh total" % (energy[i], i, energy.sum()))
 
-        info.append("Blender frame rate: " + str(blender_frame_rate))
+    def execute(self, context):
+        return execute_check(self, context)
 
-        if (blender_frame_rate % drone_fps != 0):
-            nth_frame = int(round(blender_frame_rate / drone_fps))
-        else:
-            nth_frame = int(blender_frame_rate / drone_fps)
 
-        info.append("Calculating waypoints for every " + str(nth_frame) + "th frame")
+def adaptive_distance_check(scene, drone_show, info):
+    """Proximity check skipping waypoints where no pair can get too close"""
+    drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
 
-        info.append(("Num UAVs: %d " % (drone_show.rows_x * drone_show.rows_y)))
-        info.append(("Show Length: %d:%02d.%02d (h:m.s) " % (hours, minutes, seconds)))
-        info.append(("autopilot framerate: %d fps " % drone_fps))
-        info.append(("%d waypoints will be stored in the drone" % drone_waypoints_stored))
+    if drone_show.adaptive_bound == 'MEASURED':
+        traj = bake.get_bake(scene, drone_show, info)
+        position_at = lambda w: traj.positions[w]
+        max_step = traj.speeds().max(axis=0) / drone_fps if len(frames) > 1 else 0.0
+    else:
+        # only visited waypoints are evaluated, holds while velocity check passes
+        position_at = bake.waypoint_positions(scene, drone_show, frames, info)
+        max_step = drone_show.velocity_max / drone_fps
+        info.append("Skipped frames assume drones stay below Max Velocity")
+
+    distance_min_v = drone_show.distance_min_v if drone_show.use_downwash else None
+
+    frame_current = scene.frame_current
+    warnings, evaluated, too_fast = proximity.adaptive_distance_warnings(
+            position_at, len(frames), drone_show.distance_min, max_step, distance_min_v)
+    scene.frame_set(frame_current)
+
+    if too_fast:
+        print("Drones faster than Max Velocity, skipped frames rescanned: " + ", ".join(str(i) for i in too_fast))
+        info.append("Drones faster than Max Velocity, skipped frames rescanned: " + ", ".join(str(i) for i in too_fast))
+
+    print("Skipped " + str(len(frames) - evaluated) + " of " + str(len(frames)) + " frames")
+    info.append("Skipped " + str(len(frames) - evaluated) + " of " + str(len(frames)) + " frames")
+    return warnings
 
-    def execute(self, context):
-        return execute_check(self, context)
 
 class DroneCheckDistance(Operator):
     """Check Proximity Warnings"""
@@ -102,55 +152,29 @@ class DroneCheckDistance(Operator):
 
     @staticmethod
     def main_check(obj, info):
-        import math
         scene = bpy.context.scene
         drone_show = scene.drone_show
-        show_length = drone_show.show_length
         distance_min = drone_show.distance_min
+        distance_min_v = drone_show.distance_min_v if drone_show.use_downwash else None
 
-        number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
-        scene_frames = show_length # length of animation in frames
-
-        d_treshold = distance_min*100 # distance threshold in centimeters 
-
-        blender_frame_rate = scene.render.fps
-        drone_fps = min(4 ,math.floor(drone_show.max_waypoints/(show_length/blender_frame_rate))) #1fps - 4fps
+        drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
 
-        if (blender_frame_rate % drone_fps != 0):
-            nth_frame = int(round(blender_frame_rate / drone_fps))
-        else:
-            nth_frame = int(blender_frame_rate / drone_fps)
-
-        print("\nChecking every " + str(nth_frame) + "th frame")
-        info.append("Checking every " + str(nth_frame) + "th frame")
+        print("\nChecking every %g frames" % step)
+        info.append("Checking every %g frames" % step)
         print("\nRunning distance check\n")
         info.append("Running distance check")
+        if distance_min_v is not None:
+            info.append("Downwash separation: %.2f m horizontal, %.2f m vertical" % (distance_min, distance_min_v))
+
+        if drone_show.use_adaptive:
+            warnings = adaptive_distance_check(scene, drone_show, info)
+        else:
+            traj = bake.get_bake(scene, drone_show, info)
+            warnings = proximity.distance_warnings(traj.positions, distance_min, distance_min_v)
 
-        for i in range(0, number_of_uavs):
-            ob = bpy.data.objects['drone_' + str(i)]
-
-            print("\nChecking drone " + str(i))
-            info.append("Checking drone " + str(i))
-
-            for f in range(scene.frame_start, scene.frame_end):
-                if ((f-1) % nth_frame == 0):
-                    scene.frame_set(f)
-                    x = int(ob.matrix_world.to_translation().x*100)
-                    y = int(ob.matrix_world.to_translation().y*100)
-                    z = int(ob.matrix_world.to_translation().z*100)
-                    for k in range(i+1, number_of_uavs):
-                        if (k != i):
-                            ob2 = bpy.data.objects['drone_' + str(k)]
-                            x2 = int(ob2.matrix_world.to_translation().x*100)
-                            y2 = int(ob2.matrix_world.to_translation().y*100)
-                            z2 = int(ob2.matrix_world.to_translation().z*100)
-                            dx = x2 - x
-                            dy = y2 - y
-                            dz = z2 - z
-                            d = math.sqrt(dx*dx + dy*dy + dz*dz)
-                            if (d < d_treshold):
-                                print("Danger! Distance = " + str(round(d/100,2)) + " m between " + str(i) + " and " + str(k) + " on frame " + str(f))
-                                info.append("Danger! Distance = " + str(round(d/100,2)) + " m between " + str(i) + " and " + str(k) + " on frame " + str(f))
+        for i, k, w, d in warnings:
+            print("Danger! Distance = " + str(round(d,2)) + " m between " + str(i) + " and " + str(k) + " on frame %g" % frames[w])
+            info.append("Danger! Distance = " + str(round(d,2)) + " m between " + str(i) + " and " + str(k) + " on frame %g" % frames[w])
                         
         print("\nDone checking distance")
         info.append("Done checking distance")
@@ -159,6 +183,40 @@ class DroneCheckDistance(Operator):
         return execute_check(self, context)
 
 
+def analytic_velocity_check(scene, drone_show, info):
+    """Peak speed of every drone straight from its location keyframes,
+    returns False when the drones are not plain keyframe animated"""
+    keyframes = bake.keyframe_channels(drone_show)
+    if keyframes is None:
+        print("Drones are not animated by location keyframes only, sampling frames")
+        info.append("Drones are not animated by location keyframes only, sampling frames")
+        return False
+    channels, static = keyframes
+
+    print("\nRunning keyframe velocity check")
+    info.append("Running keyframe velocity check")
+
+    speed_treshold = drone_show.velocity_max # speed treshold in meters per second
+    peak, peak_frame = bezier.peak_speeds(channels, static, scene.frame_start, scene.frame_end, scene.render.fps)
+
+    # the same curves on the waypoint frames, shows what the sampled check would see
+    drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
+    sampled = np.zeros(len(static))
+    if len(frames) > 1:
+        sampled = velocity.speeds(bezier.positions(channels, static, frames), drone_fps).max(axis=0)
+
+    for i in np.nonzero(peak > speed_treshold)[0].tolist():
+        if np.isinf(peak[i]):
+            warning = "Danger! Jump for " + str(i) + " on frame %g" % peak_frame[i]
+        else:
+            warning = "Danger! Peak speed = " + str(round(peak[i],2)) + " m\\s for " + str(i) + " on frame %g" % round(peak_frame[i], 2)
+        if sampled[i] <= speed_treshold:
+            warning += ", missed checking every %g frames" % step
+        print(warning)
+        info.append(warning)
+    return True
+
+
 class DroneCheckVelocity(Operator):
     """Check Velocity Warnings"""
     bl_idname = "drone.check_velocity"
@@ -167,59 +225,28 @@ class DroneCheckVelocity(Operator):
 
     @staticmethod
     def main_check(obj, info):
-        import math
         scene = bpy.context.scene
         drone_show = scene.drone_show
-        show_length = drone_show.show_length
-
-        number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
-        scene_frames = show_length # length of animation in frames
 
         speed_treshold = drone_show.velocity_max # speed treshold in meters per second
 
-        blender_frame_rate = scene.render.fps
-        drone_fps = min(4 ,math.floor(drone_show.max_waypoints/(show_length/blender_frame_rate))) #1fps - 4fps
+        if drone_show.use_analytic_velocity and analytic_velocity_check(scene, drone_show, info):
+            print("\nDone checking velocity")
+            info.append("Done checking velocity")
+            return
 
-        l_x = 0
-        l_y = 0
-        l_z = 0
-
-        if (blender_frame_rate % drone_fps != 0):
-            nth_frame = int(round(blender_frame_rate / drone_fps))
-        else:
-            nth_frame = int(blender_frame_rate / drone_fps)
+        drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
 
-        print("\nChecking every " + str(nth_frame) + "th frame")
-        info.append("Checking every " + str(nth_frame) + "th frame")
+        print("\nChecking every %g frames" % step)
+        info.append("Checking every %g frames" % step)
         print("\nRunning velocity check")
         info.append("Running velocity check")
 
-        for i in range(0, number_of_uavs):
-            ob = bpy.data.objects['drone_' + str(i)]
-            print("\nChecking drone " + str(i))
-            info.append("Checking drone " + str(i))
-            for f in range(scene.frame_start, scene.frame_end):
-                if ((f-1) % nth_frame == 0):
-                    scene.frame_set(f)
-                    if (f>nth_frame):
-                        x = ob.matrix_world.to_translation().x
-                        y = ob.matrix_world.to_translation().y
-                        z = ob.matrix_world.to_translation().z
-                        dx = l_x - x
-                        dy = l_y - y
-                        dz = l_z - z
-                        d = math.sqrt(dx*dx + dy*dy + dz*dz)
-                        s = d * drone_fps
-                        if (s > speed_treshold):
-                            print("Danger! Speed = " + str(round(s,2)) + " m\s for " + str(i) + " on frame " + str(f))
-                            info.append("Danger! Speed = " + str(round(s,2)) + " m\s for " + str(i) + " on frame " + str(f))
-                        l_x = x
-                        l_y = y
-                        l_z = z
-                    else:
-                        l_x = ob.matrix_world.to_translation().x
-                        l_y = ob.matrix_world.to_translation().y
-                        l_z = ob.matrix_world.to_translation().z
+        traj = bake.get_bake(scene, drone_show, info)
+
+        for i, w, s in velocity.velocity_warnings(traj.positions, drone_fps, speed_treshold):
+            print("Danger! Speed = " + str(round(s,2)) + " m\\s for " + str(i) + " on frame %g" % frames[w])
+            info.append("Danger! Speed = " + str(round(s,2)) + " m\\s for " + str(i) + " on frame %g" % frames[w])
 
         print("\nDone checking velocity")
         info.append("Done checking velocity")
@@ -323,6 +350,9 @@ class DroneRemoveDrones(Operator):
         scene = bpy.context.scene
         drone_show = scene.drone_show
 
+        from . import swarm
+        swarm.remove_swarm(scene)
+
         objects = bpy.context.scene.objects
         materials = bpy.data.materials
         meshes = bpy.data.meshes
@@ -349,6 +379,54 @@ class DroneRemoveDrones(Operator):
         drone_show.drones_added = False
         return {'FINISHED'}
 
+class DroneBuildPointCloud(Operator):
+    """Bake Drones to a Single Point Cloud Object for Fast Playback"""
+    bl_idname = "drone.build_point_cloud"
+    bl_label = "Bake Point Cloud"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    # ------------------------------
+    # Poll
+    # ------------------------------
+    def poll(cls, context):
+        scene = bpy.context.scene
+        drone_show = scene.drone_show
+        if drone_show.drones_added == True:
+            return True
+        else:
+            return False
+
+    def execute(self, context):
+        from . import swarm
+
+        info = []
+        swarm.build_swarm(bpy.context.scene, bpy.context.scene.drone_show, info)
+        report.update(*info)
+        return {'FINISHED'}
+
+
+class DroneRemovePointCloud(Operator):
+    """Remove Point Cloud and Show Drone Objects"""
+    bl_idname = "drone.remove_point_cloud"
+    bl_label = "Remove Point Cloud"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    # ------------------------------
+    # Poll
+    # ------------------------------
+    def poll(cls, context):
+        from . import swarm
+        return swarm.swarm_object() is not None
+
+    def execute(self, context):
+        from . import swarm
+
+        swarm.remove_swarm(bpy.context.scene)
+        return {'FINISHED'}
+
+
 class DroneShowCheckAll(Operator):
     """Run all checks"""
     bl_idname = "drone.check_all"
@@ -361,11 +439,27 @@ class DroneShowCheckAll(Operator):
         )
 
     def execute(self, context):
+        from . import cache
+
         obj = context.active_object
+        scene = bpy.context.scene
+        drone_show = scene.drone_show
 
-        info = []
-        for cls in self.check_cls:
-            cls.main_check(obj, info)
+        info = None
+        key = None
+        if drone_show.use_cache:
+            key = cache.results_key(scene, drone_show)
+            if key is not None:
+                info = cache.load_results(key)
+            if info is not None:
+                info.append("Cached results, animation unchanged")
+
+        if info is None:
+            info = []
+            for cls in self.check_cls:
+                cls.main_check(obj, info)
+            if key is not None:
+                cache.store_results(key, info, drone_show.cache_size)
 
         report.update(*info)
 
@@ -374,6 +468,22 @@ class DroneShowCheckAll(Operator):
         return {'FINISHED'}
 
 
+class DroneShowBatchCheck(Operator):
+    """Run all checks on many show files"""
+    bl_idname = "drone.batch_check"
+    bl_label = "Drone Show Batch Check"
+
+    def execute(self, context):
+        from . import batch
+
+        info = []
+        ret = batch.batch_check(context, info, self.report)
+        report.update(*info)
+
+        if ret:
+            return {'FINISHED'}
+        else:
+            return {'CANCELLED'}
 
 
 # -------------
@@ -456,3 +566,63 @@ class DroneShowExport(Operator):
             return {'FINISHED'}
         else:
             return {'CANCELLED'}
+
+
+class DroneShowExportStatistics(Operator):
+    """Export Separation Timeline and Drone Statistics as CSV"""
+    bl_idname = "drone.export_statistics"
+    bl_label = "Drone Show Export Statistics"
+
+    @classmethod
+    # ------------------------------
+    # Poll
+    # ------------------------------
+    def poll(cls, context):
+        scene = bpy.context.scene
+        drone_show = scene.drone_show
+        if drone_show.drones_added == True:
+            return True
+        else:
+            return False
+
+    def execute(self, context):
+        from . import export
+
+        info = []
+        ret = export.write_statistics(context, info, self.report)
+        report.update(*info)
+
+        if ret:
+            return {'FINISHED'}
+        else:
+            return {'CANCELLED'}
+
+
+class DroneShowVerifyExport(Operator):
+    """Verify Exported Drone Paths"""
+    bl_idname = "drone.verify_export"
+    bl_label = "Drone Show Verify Export"
+
+    @classmethod
+    # ------------------------------
+    # Poll
+    # ------------------------------
+    def poll(cls, context):
+        scene = bpy.context.scene
+        drone_show = scene.drone_show
+        if drone_show.drones_added == True:
+            return True
+        else:
+            return False
+
+    def execute(self, context):
+        from . import verify
+
+        info = []
+        ret = verify.verify_export(context, info, self.report)
+        report.update(*info)
+
+        if ret:
+            return {'FINISHED'}
+        else:
+            return {'CANCELLED'}
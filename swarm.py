@@ -0,0 +1,174 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Point Cloud Drones
+# one mesh vertex per drone animated by a baked point cache, spheres are
+# instanced on the vertices and LED colors drawn in the viewport
+
+import bpy
+import bgl
+import bmesh
+import os
+import numpy as np
+
+from . import (
+        bake,
+        cache,
+        )
+from .core import pointcache
+
+SWARM_NAME = "drone_swarm"
+SPHERE_NAME = "drone_swarm_sphere"
+# drone objects are moved here so they are not evaluated on playback
+HIDDEN_LAYER = 19
+
+# memory-mapped cache files by path
+_mapped = {}
+
+
+def swarm_object():
+    return bpy.data.objects.get(SWARM_NAME)
+
+
+def cache_paths():
+    if bpy.data.is_saved:
+        base = os.path.splitext(bpy.data.filepath)[0]
+    else:
+        base = os.path.join(bpy.app.tempdir, "untitled")
+    return base + "_swarm.pc2", base + "_swarm_colors.npy"
+
+
+def build_swarm(scene, drone_show, info):
+    """Bake drone objects on every frame to a point cache and build the point cloud"""
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    drones = [bpy.data.objects['drone_' + str(i)] for i in range(0, number_of_uavs)]
+    frames = np.arange(scene.frame_start, scene.frame_end + 1)
+
+    print("\nBaking point cloud for " + str(len(frames)) + " frames")
+    info.append("Baking point cloud for " + str(len(frames)) + " frames")
+
+    frame_current = scene.frame_current
+    positions, colors = bake.evaluate(scene, drones, frames)
+    key = cache.bake_key(scene, drone_show)
+
+    remove_swarm(scene)
+
+    pc2_path, colors_path = cache_paths()
+    pointcache.write_pc2(pc2_path, positions, scene.frame_start)
+    pointcache.write_colors(colors_path, colors)
+    _mapped.clear()
+
+    # one vertex per drone
+    mesh = bpy.data.meshes.new(SWARM_NAME)
+    mesh.vertices.add(number_of_uavs)
+    mesh.vertices.foreach_set('co', positions[0].astype(np.float32).ravel())
+    ob = bpy.data.objects.new(SWARM_NAME, mesh)
+    ob["led_cache"] = bpy.path.relpath(colors_path)
+    # animation the cache was baked from, checks fall back to the drones when it changes
+    ob["bake_key"] = key or ""
+    scene.objects.link(ob)
+
+    mod = ob.modifiers.new("Point Cache", 'MESH_CACHE')
+    mod.cache_format = 'PC2'
+    mod.filepath = bpy.path.relpath(pc2_path)
+    mod.frame_start = scene.frame_start
+
+    # sphere instanced on every vertex
+    sphere_mesh = bpy.data.meshes.new(SPHERE_NAME)
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(bm, u_segments=8, v_segments=4, diameter=drone_show.drone_diameter)
+    bm.to_mesh(sphere_mesh)
+    bm.free()
+    sphere = bpy.data.objects.new(SPHERE_NAME, sphere_mesh)
+    sphere.parent = ob
+    scene.objects.link(sphere)
+    ob.dupli_type = 'VERTS'
+
+    for drone in drones:
+        drone.layers = [l == HIDDEN_LAYER for l in range(20)]
+
+    scene.frame_set(frame_current)
+    info.append("Point cloud: " + str(number_of_uavs) + " drones")
+    return True
+
+
+def remove_swarm(scene):
+    """Remove point cloud objects and put drone objects back on the active layers"""
+    for name in (SPHERE_NAME, SWARM_NAME):
+        ob = bpy.data.objects.get(name)
+        if ob is not None:
+            mesh = ob.data
+            bpy.data.objects.remove(ob, do_unlink=True)
+            bpy.data.meshes.remove(mesh)
+    _mapped.clear()
+
+    for ob in scene.objects:
+        if ob.name.startswith("drone_") and ob.layers[HIDDEN_LAYER]:
+            ob.layers = scene.layers
+
+
+def swarm_colors(ob):
+    """Memory-mapped (frames, drones, 3) LED colors of the point cloud"""
+    path = bpy.path.abspath(ob["led_cache"])
+    if path not in _mapped:
+        _mapped[path] = pointcache.read_colors(path)
+    return _mapped[path]
+
+
+def swarm_positions(mod):
+    """Memory-mapped (frames, drones, 3) local positions of the point cache"""
+    path = bpy.path.abspath(mod.filepath)
+    if path not in _mapped:
+        _mapped[path] = pointcache.read_pc2(path)[1]
+    return _mapped[path]
+
+
+def evaluate(scene, ob, frames):
+    """Return (frames, drones, 3) positions and colors of the point cloud on
+    whole frames, read straight from the point cache without frame changes"""
+    mod = ob.modifiers.get("Point Cache")
+    positions = swarm_positions(mod)
+    colors = swarm_colors(ob)
+    frames = np.asarray(frames, dtype=int)
+
+    index = np.clip(frames - int(mod.frame_start), 0, len(positions) - 1)
+    matrix = np.array(ob.matrix_world)
+    co = np.asarray(positions[index], dtype=np.float64)
+    positions = co @ matrix[:3, :3].T + matrix[:3, 3]
+
+    index = np.clip(frames - scene.frame_start, 0, len(colors) - 1)
+    return positions, np.array(colors[index])
+
+
+def draw_colors():
+    """Draw LED colors of the point cloud drones in the 3D view"""
+    scene = bpy.context.scene
+    ob = swarm_object()
+    if ob is None or not ob.is_visible(scene) or "led_cache" not in ob:
+        return
+
+    mod = ob.modifiers.get("Point Cache")
+    try:
+        colors = swarm_colors(ob)
+        positions = swarm_positions(mod)
+    except (OSError, ValueError, AttributeError):
+        return
+    f = min(max(scene.frame_current - scene.frame_start, 0), len(colors) - 1, len(positions) - 1)
+
+    co = positions[f]
+    matrix = np.array(ob.matrix_world)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+    bgl.glEnable(bgl.GL_DEPTH_TEST)
+    bgl.glPointSize(6)
+    bgl.glBegin(bgl.GL_POINTS)
+    for p, c in zip(co.tolist(), colors[f].tolist()):
+        bgl.glColor3f(*c)
+        bgl.glVertex3f(*p)
+    bgl.glEnd()
+    bgl.glPointSize(1)
+    bgl.glDisable(bgl.GL_DEPTH_TEST)
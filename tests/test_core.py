@@ -0,0 +1,424 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Core Tests
+# synthetic trajectories checked against brute force results
+
+import numpy as np
+import pytest
+
+from core import (
+        trajectory,
+        proximity,
+        velocity,
+        pathfile,
+        ledtrack,
+        separation,
+        stream,
+        stats,
+        bezier,
+        )
+
+
+def random_show(waypoints=40, number_of_uavs=30, seed=0):
+    rng = np.random.RandomState(seed)
+    start = rng.uniform(0, 12, (number_of_uavs, 3))
+    steps = rng.normal(0, 0.3, (waypoints, number_of_uavs, 3))
+    return start + np.cumsum(steps, axis=0)
+
+
+def brute_force_distance(pos, distance_min):
+    found = set()
+    waypoints, number_of_uavs = pos.shape[:2]
+    for w in range(waypoints):
+        for i in range(number_of_uavs):
+            for k in range(i + 1, number_of_uavs):
+                if np.sqrt(((pos[w, k] - pos[w, i]) ** 2).sum()) < distance_min:
+                    found.add((i, k, w))
+    return found
+
+
+def test_waypoint_times_exact_step():
+    step, frames = trajectory.waypoint_times(25, 0, 100, 4)
+    assert step == 6.25
+    assert frames[0] == 1.0
+    np.testing.assert_allclose(np.diff(frames), 6.25)
+    assert frames[-1] < 100
+
+
+def test_waypoint_times_first_waypoint():
+    step, frames = trajectory.waypoint_times(24, -10, 100, 4)
+    assert frames[0] == trajectory.first_waypoint(-10, step) == -5.0
+    assert 1.0 in frames
+
+
+def test_resample_linear_motion():
+    step, frames = trajectory.waypoint_times(25, 0, 50, 4)
+    baked = trajectory.bake_frames(frames)
+    velocity_per_frame = np.array([0.1, -0.2, 0.05])
+    positions = baked[:, None, None] * velocity_per_frame + np.zeros((1, 2, 1))
+    colors = np.zeros((len(baked), 2, 3), dtype=np.float32)
+
+    resampled, resampled_colors = trajectory.resample(baked, positions, colors, frames)
+    expected = frames[:, None, None] * velocity_per_frame + np.zeros((1, 2, 1))
+    np.testing.assert_allclose(resampled, expected)
+    assert resampled_colors.shape == (len(frames), 2, 3)
+
+
+def test_resample_empty():
+    positions, colors = trajectory.resample(np.arange(3), np.zeros((3, 2, 3)), np.zeros((3, 2, 3)), np.array([]))
+    assert positions.shape == (0, 2, 3)
+
+
+@pytest.mark.parametrize('distance_min', [0.5, 1.5, 4.0])
+def test_check_distance_brute_force(distance_min):
+    pos = random_show()
+    assert proximity.check_distance(pos, distance_min) == brute_force_distance(pos, distance_min)
+
+
+def test_check_distance_blocks():
+    pos = random_show(waypoints=proximity.BLOCK_SIZE + 5, number_of_uavs=8, seed=1)
+    assert proximity.check_distance(pos, 2.0) == brute_force_distance(pos, 2.0)
+
+
+def test_distance_warnings_sorted():
+    pos = random_show()
+    warnings = proximity.distance_warnings(pos, 1.5)
+    assert [w[:3] for w in warnings] == sorted(brute_force_distance(pos, 1.5))
+    assert all(d < 1.5 for i, k, w, d in warnings)
+
+
+def test_velocity():
+    pos = np.zeros((5, 2, 3))
+    pos[:, 1, 0] = [0.0, 0.5, 1.0, 3.0, 3.5]
+    drone_fps = 2
+    np.testing.assert_allclose(velocity.speeds(pos, drone_fps)[:, 1], [1.0, 1.0, 4.0, 1.0])
+    assert velocity.check_velocity(pos, drone_fps, 3.0) == {(1, 3)}
+    assert velocity.velocity_warnings(pos, drone_fps, 3.0) == [(1, 3, 4.0)]
+
+
+def test_path_round_trip(tmp_path):
+    pos = random_show(waypoints=10, number_of_uavs=4)
+    colors = np.random.RandomState(2).uniform(0, 1, pos.shape).astype(np.float32)
+
+    records = pathfile.encode_paths(pos, colors)
+    pathfile.write_paths(str(tmp_path), records[:6])
+    pathfile.write_paths(str(tmp_path), records[6:], append=True)
+    paths = pathfile.read_paths(str(tmp_path), 4)
+
+    assert all(len(p) == 10 for p in paths)
+    np.testing.assert_array_equal(np.stack(paths, axis=1), records)
+    # truncated to centimeters
+    error = pathfile.path_positions(paths) - pos
+    assert np.abs(error).max() < 0.01
+
+
+def test_encode_paths_range():
+    with pytest.raises(ValueError):
+        pathfile.encode_paths(np.full((1, 1, 3), 400.0), np.zeros((1, 1, 3)))
+
+
+def test_compress_colors():
+    colors = np.zeros((6, 2, 3), dtype=np.float32)
+    colors[3:, 0] = 1.0
+    # slow drift below tolerance is not stored
+    colors[:, 1, 2] = np.arange(6) * 0.009
+    samples, drones = ledtrack.compress_colors(colors, 0.02)
+    events = sorted(zip(drones.tolist(), samples.tolist()))
+    assert events == [(0, 0), (0, 3), (1, 0), (1, 3)]
+
+
+def test_write_leds(tmp_path):
+    times, frames = ledtrack.led_times(24, 1.0, 49.0, 10)
+    assert times[0] == 0.0 and frames[0] == 1.0
+    colors = np.zeros((len(times), 3, 3), dtype=np.float32)
+    colors[5:, 1] = [1.0, 0.5, 0.0]
+
+    assert ledtrack.write_leds(str(tmp_path), times, colors, 0.01) == 4
+    events = np.fromfile(ledtrack.led_name(str(tmp_path), 1), dtype=ledtrack.LED_EVENT)
+    assert events['time'].tolist() == [0, 500]
+    assert events[1]['r'] == 255 and events[1]['g'] == 127 and events[1]['b'] == 0
+
+
+def test_write_leds_windows(tmp_path):
+    times, frames = ledtrack.led_times(24, 1.0, 49.0, 10)
+    rng = np.random.RandomState(3)
+    colors = np.repeat(rng.uniform(0, 1, (4, 3, 3)), 5, axis=0).astype(np.float32)
+    times = times[:len(colors)]
+    whole = tmp_path / "whole"
+    windows = tmp_path / "windows"
+    whole.mkdir()
+    windows.mkdir()
+
+    events = ledtrack.write_leds(str(whole), times, colors, 0.01)
+    last = np.full((3, 3), np.inf)
+    windowed = sum(ledtrack.write_leds(str(windows), times[s0:s0 + 7], colors[s0:s0 + 7], 0.01, last, append=s0 > 0)
+                   for s0 in range(0, len(times), 7))
+
+    assert events == windowed
+    for i in range(3):
+        a = np.fromfile(ledtrack.led_name(str(whole), i), dtype=ledtrack.LED_EVENT)
+        b = np.fromfile(ledtrack.led_name(str(windows), i), dtype=ledtrack.LED_EVENT)
+        np.testing.assert_array_equal(a, b)
+
+
+def test_separation_timeline_blocks():
+    pos = random_show(waypoints=separation.BLOCK_SIZE * 2 + 3, number_of_uavs=12, seed=4)
+    cell = separation.separation_cell(0.5)
+    min_distance, pair, nearest = separation.separation_timeline(pos, cell)
+
+    d = np.sqrt(((pos[:, :, None] - pos[:, None]) ** 2).sum(axis=3))
+    d[:, np.arange(12), np.arange(12)] = np.inf
+    np.testing.assert_allclose(min_distance, d.min(axis=(1, 2)))
+    np.testing.assert_allclose(d[np.arange(len(pos)), pair[:, 0], pair[:, 1]], min_distance)
+    expected = d.min(axis=2)
+    expected[expected >= cell] = np.inf
+    np.testing.assert_allclose(nearest, expected)
+
+
+def full_scan(pos, distance_min):
+    return [w[:3] for w in proximity.distance_warnings(pos, distance_min)]
+
+
+def test_adaptive_measured_matches_full_scan():
+    pos = random_show(waypoints=60, number_of_uavs=20, seed=5)
+    max_step = np.sqrt((np.diff(pos, axis=0) ** 2).sum(axis=2)).max(axis=0)
+    warnings, evaluated, too_fast = proximity.adaptive_distance_warnings(
+            lambda w: pos[w], len(pos), 1.0, max_step)
+    assert [w[:3] for w in warnings] == full_scan(pos, 1.0)
+    assert too_fast == []
+
+
+def test_adaptive_static_show():
+    pos = np.zeros((10, 3, 3))
+    pos[:, 1, 0] = 0.5
+    pos[:, 2, 0] = 10.0
+    warnings, evaluated, too_fast = proximity.adaptive_distance_warnings(
+            lambda w: pos[w], len(pos), 1.0, 0.0)
+    assert [w[:3] for w in warnings] == full_scan(pos, 1.0)
+    assert len(warnings) == 10
+    assert evaluated == 2
+
+
+def test_adaptive_too_fast_rescans():
+    pos = np.zeros((20, 2, 3))
+    pos[:, 1, 0] = 30.0
+    # drone 1 passes drone 0 much faster than the bound allows
+    pos[:, 1, 0] -= np.arange(20) * 2.0
+    warnings, evaluated, too_fast = proximity.adaptive_distance_warnings(
+            lambda w: pos[w], len(pos), 1.0, 0.1)
+    assert [w[:3] for w in warnings] == full_scan(pos, 1.0)
+    assert warnings and too_fast == [1]
+    assert 0 < evaluated <= len(pos)
+
+
+def test_adaptive_limit_evaluated_count():
+    for seed in range(30):
+        pos = random_show(waypoints=40, number_of_uavs=15, seed=seed)
+        warnings, evaluated, too_fast = proximity.adaptive_distance_warnings(
+                lambda w: pos[w], len(pos), 1.0, 0.05)
+        assert too_fast
+        assert len(pos) - evaluated >= 0
+        assert [w[:3] for w in warnings] == full_scan(pos, 1.0)
+
+
+@pytest.mark.parametrize('window', [1, 7, 64])
+def test_rolling_checks(window):
+    pos = random_show(waypoints=50, number_of_uavs=15, seed=6)
+    step, frames = trajectory.waypoint_times(24, 0, 24 * 50 // 4, 4)
+    pos = pos[:len(frames)]
+    colors = np.zeros(pos.shape, dtype=np.float32)
+
+    checks = stream.RollingChecks(4, 1.0, 1.5)
+    distance = []
+    speed = []
+    for w0 in range(0, len(frames), window):
+        traj = trajectory.Trajectory(pos[w0:w0 + window], colors[w0:w0 + window], frames[w0:w0 + window], 4)
+        d, s = checks.update(traj)
+        distance.extend(d)
+        speed.extend(s)
+
+    assert sorted((i, k, f) for i, k, f, d in distance) == sorted(
+            (i, k, frames[w]) for i, k, w, d in proximity.distance_warnings(pos, 1.0))
+    assert sorted((i, f) for i, f, s in speed) == sorted(
+            (i, frames[w]) for i, w, s in velocity.velocity_warnings(pos, 4, 1.5))
+    assert distance and speed
+
+
+def test_drone_statistics(tmp_path):
+    # drone 0 climbs 1 m then flies 2 m sideways, drone 1 hovers
+    pos = np.zeros((3, 2, 3))
+    pos[1:, 0, 2] = 1.0
+    pos[2, 0, 0] = 2.0
+    drone_fps = 2
+
+    path_length, peak_speed, energy = stats.drone_statistics(pos, drone_fps)
+    np.testing.assert_allclose(path_length, [3.0, 0.0])
+    np.testing.assert_allclose(peak_speed, [4.0, 0.0])
+    # speeds 2 and 4 m/s, each interval lasts 0.5 s
+    hover = stats.HOVER_POWER * 1.0
+    drag = stats.DRAG_POWER * (2.0 ** 2 + 4.0 ** 2) * 0.5
+    climb = stats.DRONE_MASS * stats.GRAVITY * 1.0
+    np.testing.assert_allclose(energy, [(hover + drag + climb) / 3600.0, hover / 3600.0])
+
+    filename = str(tmp_path / "drones.csv")
+    stats.write_drones_csv(filename, path_length, peak_speed, energy)
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "drone,path_length,peak_speed,energy_wh"
+    assert lines[1].startswith("0,3.000,4.000,")
+    assert lines[2] == "1,0.000,0.000,%.3f" % (hover / 3600.0)
+
+
+def test_separation_csv(tmp_path):
+    filename = str(tmp_path / "separation.csv")
+    stats.write_timeline_csv(filename, np.array([1.0, 7.25]), np.array([2.5, 3.0]), np.array([[0, 1], [1, 2]]))
+    with open(filename) as f:
+        assert f.read().splitlines() == ["frame,min_distance,drone_a,drone_b", "1,2.5000,0,1", "7.25,3.0000,1,2"]
+
+    filename = str(tmp_path / "histogram.csv")
+    stats.write_histogram_csv(filename, np.array([3, 1, 2]), np.array([0.0, 1.0, 2.0]))
+    with open(filename) as f:
+        assert f.read().splitlines() == ["from,to,count", "0,1,3", "1,2,1", "2,inf,2"]
+
+
+def brute_force_ellipsoid(pos, distance_min, distance_min_v):
+    d = pos[:, :, None] - pos[:, None]
+    r = (d[..., 0] ** 2 + d[..., 1] ** 2) / distance_min ** 2 + d[..., 2] ** 2 / distance_min_v ** 2
+    w, i, k = np.nonzero(r < 1.0)
+    return set((ii, kk, ww) for ww, ii, kk in zip(w.tolist(), i.tolist(), k.tolist()) if ii < kk)
+
+
+@pytest.mark.parametrize('distance_min, distance_min_v', [(1.5, 1.5), (1.0, 3.0), (2.0, 0.5), (0.5, 4.0)])
+def test_check_ellipsoid_brute_force(distance_min, distance_min_v):
+    pos = random_show(seed=7)
+    expected = brute_force_ellipsoid(pos, distance_min, distance_min_v)
+    assert expected
+    assert proximity.check_distance(pos, distance_min, distance_min_v) == expected
+
+
+@pytest.mark.parametrize('distance_min, distance_min_v', [(1.0, 3.0), (2.0, 0.5)])
+def test_adaptive_ellipsoid_matches_full_scan(distance_min, distance_min_v):
+    pos = random_show(waypoints=60, number_of_uavs=20, seed=8)
+    max_step = np.sqrt((np.diff(pos, axis=0) ** 2).sum(axis=2)).max(axis=0)
+    warnings, evaluated, too_fast = proximity.adaptive_distance_warnings(
+            lambda w: pos[w], len(pos), distance_min, max_step, distance_min_v)
+    assert [w[:3] for w in warnings] == sorted(
+            (i, k, w) for i, k, w in brute_force_ellipsoid(pos, distance_min, distance_min_v))
+    assert too_fast == []
+
+
+def channel(keys):
+    """Channel from per drone lists of (frame, value, interpolation), bezier
+    handles are a third of the neighbor interval long on the given slope"""
+    drone, co, left, right, interpolation = [], [], [], [], []
+    for d, drone_keys in enumerate(keys):
+        for j, key in enumerate(drone_keys):
+            frame, value, mode = key[:3]
+            slope = key[3] if len(key) > 3 else 0.0
+            before = frame - drone_keys[j - 1][0] if j else 1.0
+            after = drone_keys[j + 1][0] - frame if j + 1 < len(drone_keys) else 1.0
+            drone.append(d)
+            co.append((frame, value))
+            left.append((frame - before / 3.0, value - slope * before / 3.0))
+            right.append((frame + after / 3.0, value + slope * after / 3.0))
+            interpolation.append(mode)
+    return bezier.Channel(np.array(drone, dtype=int), np.array(co, dtype=float).reshape(-1, 2),
+                          np.array(left, dtype=float).reshape(-1, 2), np.array(right, dtype=float).reshape(-1, 2),
+                          np.array(interpolation, dtype=int))
+
+
+def fd_peak(channels, static, frame_start, frame_end, fps):
+    frames = np.arange(frame_start, frame_end, 0.01)
+    pos = bezier.positions(channels, static, frames)
+    return np.sqrt((np.diff(pos, axis=0) ** 2).sum(axis=2)).max(axis=0) / 0.01 * fps
+
+
+def test_bezier_linear_slope():
+    channels = [channel([[(0, 0.0, bezier.LINEAR), (10, 5.0, bezier.LINEAR)]]),
+                channel([[(0, 0.0, bezier.LINEAR), (10, -5.0, bezier.LINEAR)]]),
+                channel([[]])]
+    static = np.zeros((1, 3))
+    peak, frame = bezier.peak_speeds(channels, static, 0, 20, 24)
+    np.testing.assert_allclose(peak, [np.sqrt(2.0) * 0.5 * 24])
+    assert 0 <= frame[0] <= 10
+
+    pos = bezier.positions(channels, static, np.array([-5.0, 4.0, 15.0]))
+    np.testing.assert_allclose(pos[:, 0], [[0.0, 0.0, 0.0], [2.0, -2.0, 0.0], [5.0, -5.0, 0.0]])
+
+
+def test_bezier_peak_against_finite_difference():
+    rng = np.random.RandomState(9)
+    channels = []
+    for axis in range(3):
+        keys = []
+        for d in range(4):
+            frames = np.cumsum(rng.uniform(5, 30, 6))
+            keys.append([(f, rng.uniform(-10, 10), bezier.BEZIER, rng.uniform(-2, 2)) for f in frames])
+        channels.append(channel(keys))
+    static = np.zeros((4, 3))
+
+    peak, frame = bezier.peak_speeds(channels, static, 0, 200, 24)
+    expected = fd_peak(channels, static, 0, 200, 24)
+    assert (peak >= expected * 0.999).all()
+    assert (peak <= expected * 1.01).all()
+
+
+def test_bezier_zero_length_handle():
+    keys = [[(0, 0.0, bezier.BEZIER), (10, 5.0, bezier.BEZIER)]]
+    x = channel(keys)
+    # right handle of the first key on the key itself, vertical tangent
+    x.handle_right[0] = x.co[0]
+    channels = [x, channel([[]]), channel([[]])]
+    static = np.zeros((1, 3))
+    peak, frame = bezier.peak_speeds(channels, static, 0, 10, 24)
+    assert np.isfinite(peak).all()
+    value, derivative = bezier.evaluate(x, static[:, 0], np.zeros(1, dtype=int), np.zeros(1), -1.0, 13.0)
+    assert abs(value[0]) < 1e-9 and np.isfinite(derivative[0])
+
+
+def test_bezier_constant_jump():
+    channels = [channel([[(0, 0.0, bezier.CONSTANT), (12, 3.0, bezier.LINEAR), (20, 3.0, bezier.LINEAR)],
+                         [(0, 1.0, bezier.CONSTANT), (12, 1.0, bezier.CONSTANT)]]),
+                channel([[], []]),
+                channel([[], []])]
+    static = np.zeros((2, 3))
+    peak, frame = bezier.peak_speeds(channels, static, 0, 30, 24)
+    assert np.isinf(peak[0]) and frame[0] == 12
+    assert peak[1] == 0.0
+
+    pos = bezier.positions(channels, static, np.array([11.9, 12.0]))
+    np.testing.assert_allclose(pos[:, 0, 0], [0.0, 3.0])
+
+
+def test_bezier_drones_without_keys():
+    channels = [channel([[], [(0, 0.0, bezier.LINEAR), (10, 10.0, bezier.LINEAR)], []]),
+                channel([[], [], []]),
+                channel([[], [], []])]
+    static = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0], [4.0, 5.0, 6.0]])
+    peak, frame = bezier.peak_speeds(channels, static, 0, 20, 24)
+    np.testing.assert_allclose(peak, [0.0, 24.0, 0.0])
+
+    pos = bezier.positions(channels, static, np.array([0.0, 5.0]))
+    np.testing.assert_allclose(pos[:, 0], [[1.0, 2.0, 3.0]] * 2)
+    np.testing.assert_allclose(pos[:, 2], [[4.0, 5.0, 6.0]] * 2)
+
+
+def test_bezier_interleaved_drones():
+    # key frames of both drones interleave, segments must not cross drones
+    channels = [channel([[(0, 0.0, bezier.LINEAR), (20, 2.0, bezier.LINEAR)],
+                         [(5, 10.0, bezier.LINEAR), (15, 0.0, bezier.LINEAR)]]),
+                channel([[], []]),
+                channel([[], []])]
+    static = np.zeros((2, 3))
+    peak, frame = bezier.peak_speeds(channels, static, 0, 25, 10)
+    np.testing.assert_allclose(peak, [1.0, 10.0])
+    assert 5 <= frame[1] <= 15
+
+    pos = bezier.positions(channels, static, np.array([0.0, 5.0, 10.0, 15.0, 20.0]))
+    np.testing.assert_allclose(pos[:, 0, 0], [0.0, 0.5, 1.0, 1.5, 2.0])
+    np.testing.assert_allclose(pos[:, 1, 0], [10.0, 10.0, 5.0, 0.0, 0.0])
@@ -86,22 +86,49 @@ class DroneShowToolBar:
         col.operator("drone.add_drones", text="Add Drones", icon="GROUP_VERTEX")
         col.operator("drone.remove_drones", text="Remove Drones",icon="X")
 
+        row = layout.row()
+        row.label("Point Cloud:")
+
+        col = layout.column(align=True)
+        col.operator("drone.build_point_cloud", text="Bake Point Cloud", icon="PARTICLE_POINT")
+        col.operator("drone.remove_point_cloud", text="Remove Point Cloud", icon="X")
+        col.prop(drone_show, "use_point_cloud")
+
         row = layout.row()
         row.label("Limits:")
 
         col = layout.column(align=True)
         col.prop(drone_show, "distance_min")
+        col.prop(drone_show, "use_downwash")
+        if drone_show.use_downwash:
+            col.prop(drone_show, "distance_min_v")
         col.prop(drone_show, "velocity_max")
         col.prop(drone_show, "max_waypoints")
+        col.prop(drone_show, "geofence_radius")
+        col.prop(drone_show, "geofence_height")
 
         row = layout.row()
         row.label("Checks:")
         col = layout.column(align=True)
         col.operator("drone.check_statistics", text="Statiscics")
         col.operator("drone.check_distance", text="Proximity")
+        row = col.row(align=True)
+        row.prop(drone_show, "use_adaptive", text="Adaptive")
+        if drone_show.use_adaptive:
+            row.prop(drone_show, "adaptive_bound", text="")
+        col.prop(drone_show, "use_analytic_velocity", text="Keyframes")
         col.operator("drone.check_velocity", text="Velocity")
         col = layout.column()
         col.operator("drone.check_all", text="Check All")
+        row = col.row(align=True)
+        row.prop(drone_show, "use_cache")
+        row.prop(drone_show, "cache_size")
+
+        col = layout.column(align=True)
+        col.prop(drone_show, "batch_path", text="")
+        col.prop(drone_show, "batch_jobs")
+        col.prop(drone_show, "batch_timeout")
+        col.operator("drone.batch_check", text="Batch Check")
 
         col = layout.column()
         rowsub = col.row(align=True)
@@ -111,8 +138,23 @@ class DroneShowToolBar:
         rowsub = col.row()
         rowsub.prop(drone_show, "export_path", text="")
 
+        rowsub = col.row(align=True)
+        rowsub.prop(drone_show, "use_streaming")
+        if drone_show.use_streaming:
+            rowsub.prop(drone_show, "stream_window")
+
+        rowsub = col.row(align=True)
+        rowsub.prop(drone_show, "export_led")
+        if drone_show.export_led:
+            rowsub = col.row(align=True)
+            rowsub.prop(drone_show, "led_fps")
+            rowsub.prop(drone_show, "led_tolerance")
+
         rowsub = col.row(align=True)
         rowsub.operator("drone.export", text="Export", icon='EXPORT')
+        rowsub.operator("drone.verify_export", text="Verify", icon='FILE_TICK')
+        rowsub = col.row(align=True)
+        rowsub.operator("drone.export_statistics", text="Export Statistics CSV")
 
         DroneShowToolBar.draw_report(layout, context)
 
@@ -0,0 +1,103 @@
+'''
+no license yet
+
+Copyright (C) 2019 BaseMotion (http://basemotion.eu)
+Created by Martins Upitis (martinsh)
+'''
+
+# Verify Exported Drone Paths
+# re-runs the checks on the quantized PATH files and compares with the scene
+
+import bpy
+import numpy as np
+
+from . import (
+        bake,
+        )
+from .core import (
+        proximity,
+        velocity,
+        geofence,
+        pathfile,
+        )
+
+
+def run_checks(pos, drone_fps, drone_show):
+    distance_min_v = drone_show.distance_min_v if drone_show.use_downwash else None
+    return (
+        proximity.check_distance(pos, drone_show.distance_min, distance_min_v),
+        velocity.check_velocity(pos, drone_fps, drone_show.velocity_max),
+        geofence.check_geofence(pos, drone_show.geofence_radius, drone_show.geofence_height),
+        )
+
+
+def verify_export(context, info, report_cb):
+    scene = bpy.context.scene
+    drone_show = scene.drone_show
+
+    filepath = bpy.path.abspath(drone_show.export_path)
+
+    number_of_uavs = drone_show.rows_x * drone_show.rows_y # number of uavs in blender scene
+    drone_fps, step, frames = bake.waypoint_times(scene, drone_show)
+
+    print("\nVerifying exported paths in " + filepath)
+    info.append("Verifying exported paths")
+
+    try:
+        paths = pathfile.read_paths(filepath, number_of_uavs)
+    except (OSError, ValueError) as e:
+        info.append("Can't read exported paths: " + str(e))
+        if report_cb is not None:
+            report_cb({'ERROR'}, "Can't read exported paths, export first")
+        return False
+
+    lengths = set(len(p) for p in paths)
+    if lengths != {len(frames)}:
+        # show length or framerate changed since export, waypoints can't be compared
+        text = ("Waypoint count mismatch: files have " +
+                ", ".join(str(l) for l in sorted(lengths)) +
+                ", scene has " + str(len(frames)))
+        print(text)
+        info.append(text)
+        if report_cb is not None:
+            report_cb({'WARNING'}, "Exported paths don't match the scene, export again")
+        return False
+
+    file_pos = pathfile.path_positions(paths)
+    waypoints = len(file_pos)
+
+    # scene positions on the same frames
+    scene_pos = bake.get_bake(scene, drone_show, info).positions[:waypoints]
+
+    error = np.abs(file_pos - scene_pos).max() if waypoints else 0.0
+    info.append("Max quantization error: " + str(round(error * 100, 2)) + " cm")
+
+    names = ("distance", "velocity", "geofence")
+    file_checks = run_checks(file_pos, drone_fps, drone_show)
+    scene_checks = run_checks(scene_pos, drone_fps, drone_show)
+
+    verified = True
+    for name, in_file, in_scene in zip(names, file_checks, scene_checks):
+        added = sorted(in_file - in_scene, key=lambda v: v[-1])
+        removed = sorted(in_scene - in_file, key=lambda v: v[-1])
+        info.append("%s: %d in export, %d in scene" % (name.capitalize(), len(in_file), len(in_scene)))
+        for v in added:
+            text = "Export only " + name + " warning for " + " and ".join(str(d) for d in v[:-1]) + " on frame %g" % frames[v[-1]]
+            print(text)
+            info.append(text)
+        for v in removed:
+            text = "Scene only " + name + " warning for " + " and ".join(str(d) for d in v[:-1]) + " on frame %g" % frames[v[-1]]
+            print(text)
+            info.append(text)
+        if in_file:
+            verified = False
+
+    print("\nDone verifying export")
+    info.append("Done verifying export")
+
+    if report_cb is not None:
+        if verified:
+            report_cb({'INFO'}, "Exported paths verified")
+        else:
+            report_cb({'WARNING'}, "Exported paths have warnings")
+    return True